@@ -0,0 +1,3 @@
+"""
+Package benchmarks pour le projet py-lbc
+"""
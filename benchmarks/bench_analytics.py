@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark des analyses : compare le module vectorisé src.analytics à une boucle Python
+ligne par ligne (objets Cars, regroupement dans des dictionnaires) sur une table
+synthétique, et vérifie que les médianes calculées sont identiques.
+
+Usage:
+    python -m benchmarks.bench_analytics --rows 1000000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from benchmarks.datagen import populate
+from src.analytics import analyse
+from src.cars_dao import CarsDAO
+
+
+def analyse_per_row(cars_dao: CarsDAO) -> dict:
+    """
+    Version de référence : une itération Python par annonce (toutes les annonces
+    synthétiques sont actives)
+    """
+    prices = defaultdict(list)
+    by_model = defaultdict(list)
+    for car in cars_dao.get_all_cars():
+        if not car.current_price:
+            continue
+        prices[(car.brand, car.model, car.year or 0, car.gearbox or "")].append(car.current_price)
+        by_model[(car.brand, car.model)].append(car)
+    medians = {key: statistics.median(values) for key, values in prices.items()}
+    for cars in by_model.values():
+        # Moindres carrés prix ~ année + kilométrage, sommes accumulées en Python
+        n = len(cars)
+        mean_year = sum(car.year or 0 for car in cars) / n
+        mean_mileage = sum(car.mileage or 0 for car in cars) / n
+        mean_price = sum(car.current_price for car in cars) / n
+        syy = sym = smm = syp = smp = 0.0
+        for car in cars:
+            y, m, p = (car.year or 0) - mean_year, (car.mileage or 0) - mean_mileage, car.current_price - mean_price
+            syy += y * y
+            sym += y * m
+            smm += m * m
+            syp += y * p
+            smp += m * p
+        det = syy * smm - sym * sym
+        per_year = (smm * syp - sym * smp) / det if det else 0.0
+        per_km = (syy * smp - sym * syp) / det if det else 0.0
+        residuals = [car.current_price - (mean_price + per_year * ((car.year or 0) - mean_year)
+                                          + per_km * ((car.mileage or 0) - mean_mileage)) for car in cars]
+        residual_median = statistics.median(residuals)
+        statistics.median(abs(r - residual_median) for r in residuals)
+    return medians
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des analyses vectorisées")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Nombre d'annonces synthétiques")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with CarsDAO(os.path.join(tmp_dir, "analytics.db")) as cars_dao:
+            start = time.perf_counter()
+            populate(cars_dao, args.rows)
+            print(f"{'génération de la table':<30} {time.perf_counter() - start:>10.2f} s")
+
+            start = time.perf_counter()
+            results = analyse(cars_dao)
+            vectorized = time.perf_counter() - start
+            start = time.perf_counter()
+            medians = analyse_per_row(cars_dao)
+            per_row = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for row in results["groups"]
+        if round(medians[(row["brand"], row["model"], row["year"], row["gearbox"])]) != row["p50"]
+    )
+    print(f"{'boucle par ligne':<30} {per_row:>10.2f} s")
+    print(f"{'numpy vectorisé':<30} {vectorized:>10.2f} s  (x{per_row / vectorized:.1f})")
+    print(f"groupes : {len(results['groups'])} - médianes différentes : {mismatches} - "
+          f"annonces sous le prix du marché : {len(results['underpriced'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la représentation des annonces : compare la dataclass Cars slottée et ses
+constructeurs (from_dict, from_row) à l'ancienne dataclass avec __dict__, en mémoire
+occupée et en vitesse de construction.
+
+Usage:
+    python -m benchmarks.bench_cars --count 200000
+"""
+
+import argparse
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from src.cars import Cars
+from src.cars_dao import CAR_COLUMNS, CarRow
+
+
+@dataclass
+class LegacyCars:
+    brand: str
+    model: str
+    link: str
+    title: str
+    year: int
+    original_price: float
+    current_price: float
+    mileage: int
+    gearbox: str
+    first_publication_date: datetime = None
+    update_date: datetime = None
+    duration_on_site: int = 0
+    price_variation: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LegacyCars':
+        return cls(
+            brand=data.get("brand", ""),
+            model=data.get("model", ""),
+            link=data.get("link", ""),
+            title=data.get("title", ""),
+            year=data.get("year", 0),
+            original_price=data.get("original_price", 0.0),
+            current_price=data.get("current_price", 0.0),
+            mileage=data.get("mileage", 0),
+            gearbox=data.get("gearbox", ""),
+            first_publication_date=data.get("first_publication_date", None),
+            update_date=data.get("update_date", None),
+            duration_on_site=data.get("duration_on_site", 0),
+            price_variation=data.get("price_variation", 0.0)
+        )
+
+
+def make_dicts(count: int) -> list[dict]:
+    """
+    Annonces telles que produites par l'analyse des pages de résultats
+    """
+    return [
+        {"link": f"/ad/voitures/{i}", "title": f"Porsche 911 n°{i}", "year": 2008 + i % 15, "original_price": 45000.0 + i % 1000,
+         "current_price": 40000.0 + i % 1000, "mileage": 10000 + i % 200000, "gearbox": "Automatique" if i % 2 else "Manuelle",
+         "first_publication_date": datetime(2025, 1 + i % 12, 1 + i % 28, 10, i % 60), "index_date": datetime(2025, 1, 1)}
+        for i in range(count)
+    ]
+
+
+def measure(build) -> tuple[float, int]:
+    """
+    Durée de construction et mémoire occupée par les objets construits
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    objects = build()
+    duration = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return duration, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la classe Cars")
+    parser.add_argument("--count", type=int, default=200_000, help="Nombre d'annonces construites")
+    args = parser.parse_args()
+
+    dicts = make_dicts(args.count)
+    rows = [CarRow._make((i, "PORSCHE", "PORSCHE_911", *(d.get(column) for column in CAR_COLUMNS[3:12]), 0, 0.0, None))
+            for i, d in enumerate(dicts)]
+    # Memory is measured separately from speed: tracemalloc slows allocations down
+    results = {}
+    for name, build in (
+        ("dataclass from_dict", lambda: [LegacyCars.from_dict(d) for d in dicts]),
+        ("slots from_dict", lambda: [Cars.from_dict(d) for d in dicts]),
+        ("slots from_row", lambda: [Cars.from_row(row) for row in rows]),
+    ):
+        start = time.perf_counter()
+        build()
+        duration = time.perf_counter() - start
+        _, size = measure(build)
+        results[name] = (duration, size)
+    for name, (duration, size) in results.items():
+        print(f"{name:<22} {args.count / duration:>12.0f} annonces/s {size / args.count:>8.0f} octets/annonce")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark des écritures CarsDAO : compare le nombre de lignes écrites par seconde
+entre l'ancienne conception (une connexion et un commit par ligne) et la connexion
+persistante en WAL, avec ou sans transaction explicite.
+
+Usage:
+    python -m benchmarks.bench_cars_dao --rows 5000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date
+from src.cars import Cars
+from src.cars_dao import CarsDAO
+
+
+def make_cars(rows: int) -> list[Cars]:
+    """
+    Génère des annonces synthétiques
+
+    Args:
+        rows (int): nombre d'annonces à générer
+
+    Returns:
+        list[Cars]: annonces générées
+    """
+    return [
+        Cars(brand="PORSCHE", model="PORSCHE_911", link=f"/ad/voitures/{i}", title=f"Porsche 911 n°{i}",
+             year=2008 + i % 15, original_price=None, current_price=40000.0 + i % 50000,
+             mileage=10000 + i % 200000, gearbox="Automatique" if i % 2 else "Manuelle")
+        for i in range(rows)
+    ]
+
+
+def bench_legacy(db_path: str, cars: list[Cars]) -> float:
+    """
+    Reproduit l'ancienne conception : une connexion et un commit par ligne insérée
+    """
+    CarsDAO(db_path).close()
+    start = time.perf_counter()
+    for car in cars:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("""
+                INSERT INTO cars (brand, model, link, title, year, original_price, current_price, mileage, gearbox, update_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (car.brand, car.model, car.link, car.title, car.year, car.original_price, car.current_price, car.mileage, car.gearbox, date.today()))
+            conn.commit()
+        conn.close()
+    return time.perf_counter() - start
+
+
+def bench_persistent(db_path: str, cars: list[Cars], grouped: bool) -> float:
+    """
+    Connexion persistante du DAO, avec un commit par ligne ou une seule transaction
+    """
+    with CarsDAO(db_path) as cars_dao:
+        start = time.perf_counter()
+        if grouped:
+            with cars_dao.transaction():
+                for car in cars:
+                    cars_dao.insert_car(car)
+        else:
+            for car in cars:
+                cars_dao.insert_car(car)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des écritures CarsDAO")
+    parser.add_argument("--rows", type=int, default=5000, help="Nombre de lignes à insérer")
+    args = parser.parse_args()
+
+    cars = make_cars(args.rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {
+            "connexion par ligne": bench_legacy(os.path.join(tmp_dir, "legacy.db"), cars),
+            "connexion persistante": bench_persistent(os.path.join(tmp_dir, "persistent.db"), cars, grouped=False),
+            "connexion persistante + transaction": bench_persistent(os.path.join(tmp_dir, "grouped.db"), cars, grouped=True),
+        }
+    for name, duration in results.items():
+        print(f"{name:<40} {args.rows / duration:>12.0f} lignes/s")
+
+
+if __name__ == "__main__":
+    main()
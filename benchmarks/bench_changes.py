@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark du journal des changements : après un crawl qui modifie une petite partie des
+annonces (nouvelles annonces, baisses de prix, retraits), compare la détection des
+changements par différence de deux copies complètes de la table (iter_cars avant et
+après le crawl) à la lecture du journal car_changes depuis le curseur du consommateur, et
+vérifie que les deux trouvent les mêmes changements.
+
+Usage:
+    python -m benchmarks.bench_changes --rows 1000000 --changed 0.01
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.datagen import MODELS, populate, synthetic_cars
+from src.cars_dao import CarsDAO
+
+
+def crawl(cars_dao: CarsDAO, rows: int, changed: int):
+    """
+    Simule un crawl : `changed` baisses de prix, `changed` nouvelles annonces et `changed`
+    annonces retirées (les premières annonces du premier modèle)
+    """
+    step = max(1, rows // changed)
+    cars = synthetic_cars(rows)
+    updated = [cars[i] for i in range(0, rows, step)][:changed]
+    for car in updated:
+        car.current_price -= 1000
+    cars_dao.upsert_cars(updated)
+    cars += synthetic_cars(changed, start=rows)
+    cars_dao.upsert_cars(cars[rows:])
+    brand, model = MODELS[0]
+    removed = {car.link for car in cars[:changed * len(MODELS):len(MODELS)]}
+    seen = {car.link for car in cars if car.model == model and car.link not in removed}
+    cars_dao.mark_removed(brand, model, seen)
+
+
+def diff_snapshots(before: list, after) -> set[tuple[str, str]]:
+    """
+    Version de référence : compare deux copies complètes de la table, annonce par annonce
+    """
+    previous = {car.link: car for car in before}
+    changes = set()
+    for car in after:
+        old = previous.get(car.link)
+        if old is None:
+            changes.add(("new", car.link))
+            continue
+        if old.current_price != car.current_price:
+            changes.add(("price", car.link))
+        if old.removed_date is None and car.removed_date is not None:
+            changes.add(("removed", car.link))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du journal des changements")
+    parser.add_argument("--rows", type=int, default=100_000, help="Nombre d'annonces")
+    parser.add_argument("--changed", type=float, default=0.01, help="Proportion d'annonces modifiées par le crawl")
+    args = parser.parse_args()
+    changed = max(1, int(args.rows * args.changed))
+
+    with tempfile.TemporaryDirectory() as tmp_dir, CarsDAO(os.path.join(tmp_dir, "cars.db")) as cars_dao:
+        populate(cars_dao, args.rows)
+        cursor = cars_dao.last_change_seq()
+
+        start = time.perf_counter()
+        before = list(cars_dao.iter_cars())
+        snapshot = time.perf_counter() - start
+        crawl(cars_dao, args.rows, changed)
+        start = time.perf_counter()
+        expected = diff_snapshots(before, cars_dao.iter_cars())
+        snapshot += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = {(change.kind, change.link) for change in cars_dao.iter_changes(cursor)}
+        journal = time.perf_counter() - start
+
+    if found != expected:
+        raise SystemExit(f"Changements différents : {len(found ^ expected)} écarts")
+    print(f"{args.rows} annonces, {len(found)} changements")
+    print(f"différence de copies : {snapshot:.3f} s")
+    print(f"journal car_changes  : {journal:.3f} s ({snapshot / journal:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire de l'export brut : pour plusieurs tailles de table, compare le pic de
+mémoire de l'export en flux (src.export) à celui d'un export CSV construit à partir de
+get_all_cars(). Chaque mesure est faite dans un processus neuf.
+
+Le pic d'allocations Python (tracemalloc) est la mesure pertinente : le RSS inclut aussi
+les pages de la base projetées en mémoire (PRAGMA mmap_size) et le cache de pages sqlite.
+Les durées sont mesurées sous tracemalloc et donc majorées.
+
+Usage:
+    python -m benchmarks.bench_export --rows 100000 400000
+"""
+
+import argparse
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from src.cars_dao import CarsDAO
+from benchmarks.bench_analytics import populate
+
+
+def run_child(mode: str, db_path: str, output_dir: str):
+    """
+    Exporte la base dans le processus courant et affiche les mesures en JSON
+    """
+    with CarsDAO(db_path) as cars_dao:
+        tracemalloc.start()
+        start = time.perf_counter()
+        if mode == "get_all_cars":
+            os.makedirs(output_dir, exist_ok=True)
+            with open(os.path.join(output_dir, "cars.csv"), mode='w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.writer(csvfile)
+                for car in cars_dao.get_all_cars():
+                    writer.writerow(car.to_dict().values())
+        else:
+            from src.export import export_cars
+            export_cars(cars_dao, output_dir, formats=(mode,))
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    print(json.dumps({"duration": duration, "peak": peak, "maxrss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mémoire de l'export")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 400_000], help="Tailles de table à mesurer")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "DB", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(*args.child)
+        return
+
+    print(f"{'lignes':>10} {'mode':<14} {'durée (s)':>10} {'pic Python (Mo)':>16} {'RSS max (Mo)':>13}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in args.rows:
+            db_path = os.path.join(tmp_dir, f"cars_{rows}.db")
+            with CarsDAO(db_path) as cars_dao:
+                populate(cars_dao, rows)
+            for mode in ("get_all_cars", "csv", "parquet"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_export", "--child", mode, db_path, os.path.join(tmp_dir, f"{mode}_{rows}")],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(output.splitlines()[-1])
+                print(f"{rows:>10} {mode:<14} {result['duration']:>10.2f} {result['peak'] / 2**20:>16.1f} {result['maxrss'] / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Profil mémoire d'un crawl long : rejoue hors ligne (cache HTTP en mode rejeu) une
+recherche de --pages pages de résultats, puis la récupération des prix d'origine sur
+--articles pages d'annonces, en relevant la mémoire résidente du processus après chaque
+page. La mémoire anonyme (tas Python, arbres d'analyse) doit rester stable une fois les
+premières pages passées ; la mémoire associée aux fichiers (base sqlite projetée en
+mémoire, qui grossit avec les annonces enregistrées) est affichée à part. Le cache de pages
+de sqlite, qui augmente avec la base jusqu'à sa limite, est réduit à --db-cache-mb pour ne
+pas masquer une fuite. Le code de sortie vaut 1 si la mémoire anonyme augmente de plus de
+--max-growth Mo après l'échauffement.
+
+Usage:
+    python -m benchmarks.bench_memory --pages 1000 --articles 1000
+    python -m benchmarks.bench_memory --pages 200 --dom --padding-kb 500
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from benchmarks.fixtures import PER_PAGE, article_page_html, search_page_html
+from benchmarks.http_stub import FIRST_AD_ID
+from src.backfill import run_backfill
+from src.cars_dao import CarsDAO
+from src.http_cache import ResponseCache
+from src.pipeline import crawl_search
+from src.scrapping import Scraper
+
+BASE_URL = "https://replay.invalid"
+
+
+def memory() -> dict[str, float]:
+    """
+    Mémoire résidente du processus en Mo : totale, anonyme et associée aux fichiers
+    (lue dans /proc/self/status, Linux uniquement)
+    """
+    values = {}
+    with open("/proc/self/status", encoding='utf-8') as status_file:
+        for line in status_file:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "RssAnon", "RssFile"):
+                values[name] = int(value.split()[0]) / 1024
+    return {"rss": values["VmRSS"], "anon": values["RssAnon"], "file": values["RssFile"]}
+
+
+def record_pages(cache_path: str, pages: int, articles: int, padding_kb: int):
+    """
+    Enregistre dans le cache HTTP les pages de résultats et les pages d'annonces rejouées,
+    éventuellement grossies de `padding_kb` Ko de balisage hors des cartes d'annonces
+    """
+    padding = '<div class="padding"><span>Lorem ipsum dolor sit amet</span></div>' * (padding_kb * 16)
+    cache = ResponseCache(cache_path, max_size=10 * 1024 ** 3)
+    try:
+        for page in range(1, pages + 1):
+            body = search_page_html(page, pages).replace("<body>", "<body>" + padding, 1)
+            cache.store(f"{BASE_URL}/recherche?page={page}", body.encode())
+        for i in range(articles):
+            cache.store(f"{BASE_URL}/ad/voitures/{FIRST_AD_ID + i}", article_page_html(i).encode())
+    finally:
+        cache.close()
+
+
+def replay_crawl(pages: int, articles: int, padding_kb: int = 0, json_first: bool = True,
+                 parser_backend: str = "html.parser", db_cache_mb: int = 2) -> tuple[list[dict], dict, dict, float]:
+    """
+    Rejoue hors ligne un crawl de `pages` pages de résultats puis la récupération des prix
+    d'origine de `articles` annonces, en relevant la mémoire après chaque page
+
+    Returns:
+        tuple[list[dict], dict, dict, float]: mémoire après chaque page de résultats, à la
+        fin du crawl et à la fin des prix d'origine, durée totale en secondes
+    """
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, "http_cache.db")
+        record_pages(cache_path, pages, articles, padding_kb)
+        cache = ResponseCache(cache_path, max_size=10 * 1024 ** 3, replay=True)
+        start = time.perf_counter()
+        with Scraper(BASE_URL, cache=cache) as scraper, CarsDAO(os.path.join(tmp_dir, "cars.db"), db_cache_mb) as cars_dao:
+            crawl_search(scraper, cars_dao, f"{BASE_URL}/recherche?page=1", "PORSCHE", "PORSCHE_911",
+                         parser_backend=parser_backend, json_first=json_first,
+                         on_page=lambda page_url: samples.append(memory()))
+            crawl = memory()
+            run_backfill(scraper, cars_dao, itertools.islice(cars_dao.iter_cars(), articles))
+            backfill = memory()
+        elapsed = time.perf_counter() - start
+    return samples, crawl, backfill, elapsed
+
+
+def anon_growth(samples: list[dict], warmup: float = 0.1) -> tuple[dict, float]:
+    """
+    Hausse de la mémoire anonyme après l'échauffement (proportion `warmup` des relevés)
+
+    Returns:
+        tuple[dict, float]: relevé de fin d'échauffement, hausse maximale en Mo
+    """
+    reference = samples[max(0, int(len(samples) * warmup) - 1)]
+    return reference, max(sample["anon"] for sample in samples) - reference["anon"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profil mémoire d'un crawl rejoué")
+    parser.add_argument("--pages", type=int, default=1000, help="Nombre de pages de résultats")
+    parser.add_argument("--articles", type=int, default=1000, help="Nombre de pages d'annonces (prix d'origine)")
+    parser.add_argument("--padding-kb", type=int, default=0, help="Balisage ajouté à chaque page de résultats (Ko)")
+    parser.add_argument("--dom", action="store_true", help="Analyse du DOM plutôt que du JSON embarqué")
+    parser.add_argument("--parser", default="html.parser", help="Moteur d'analyse du DOM")
+    parser.add_argument("--db-cache-mb", type=int, default=2, help="Cache de pages de la base des annonces (Mo)")
+    parser.add_argument("--warmup", type=float, default=0.1, help="Proportion de pages d'échauffement")
+    parser.add_argument("--max-growth", type=float, default=10.0, help="Hausse tolérée de la mémoire anonyme (Mo)")
+    args = parser.parse_args()
+    articles = min(args.articles, args.pages * PER_PAGE)
+
+    samples, crawl, backfill, elapsed = replay_crawl(args.pages, articles, args.padding_kb, not args.dom,
+                                                     args.parser, args.db_cache_mb)
+
+    warmup, growth = anon_growth(samples + [crawl, backfill], args.warmup)
+    print(f"{len(samples)} pages de résultats et {articles} pages d'annonces en {elapsed:.1f} s")
+    print(f"{'étape':<28} {'RSS (Mo)':>10} {'anonyme':>10} {'fichiers':>10}")
+    steps = [("première page", samples[0]), (f"échauffement ({args.warmup:.0%})", warmup)]
+    steps += [(f"page {i + 1}", samples[i]) for i in range(len(samples) // 4, len(samples), len(samples) // 4 or 1)][:3]
+    steps += [("fin du crawl", crawl), ("fin des prix d'origine", backfill)]
+    for name, sample in steps:
+        print(f"{name:<28} {sample['rss']:>10.1f} {sample['anon']:>10.1f} {sample['file']:>10.1f}")
+    print(f"hausse de la mémoire anonyme après l'échauffement : {growth:.1f} Mo (tolérée : {args.max_growth:.1f} Mo)")
+    if growth > args.max_growth:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
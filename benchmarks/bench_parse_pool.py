@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark du pool d'analyse : débit de l'analyse d'un corpus de pages de résultats et de
+pages d'annonces synthétiques, dans le processus courant puis avec 1, 2, 4... processus
+(jusqu'au nombre de cœurs), résultats ordonnés ou non.
+
+Usage:
+    python -m benchmarks.bench_parse_pool --pages 200 --backend html.parser
+"""
+
+import argparse
+import os
+import time
+from benchmarks.fixtures import article_page_html, search_page_html
+from src.parse_pool import ParsePool, _parse_articles, _parse_search_pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pool d'analyse")
+    parser.add_argument("--pages", type=int, default=200, help="Nombre de pages de chaque type")
+    parser.add_argument("--backend", default="html.parser", help="Moteur d'analyse des pages de résultats")
+    parser.add_argument("--chunksize", type=int, default=8, help="Nombre de pages par tâche")
+    args = parser.parse_args()
+
+    search_pages = [(page, search_page_html(page, args.pages).encode()) for page in range(1, args.pages + 1)]
+    article_pages = [(i, article_page_html(i).encode()) for i in range(args.pages)]
+    fields = ["old_price", "first_publication_date"]
+
+    start = time.perf_counter()
+    expected = _parse_search_pages([content for _, content in search_pages], args.backend, False)
+    serial_search = time.perf_counter() - start
+    start = time.perf_counter()
+    _parse_articles([content for _, content in article_pages], fields)
+    serial_articles = time.perf_counter() - start
+    print(f"{'mode':<24} {'recherche (pages/s)':>20} {'annonces (pages/s)':>20}")
+    print(f"{'processus courant':<24} {args.pages / serial_search:>20.1f} {args.pages / serial_articles:>20.1f}")
+
+    workers = 1
+    cpu_count = os.cpu_count() or 1
+    while True:
+        for ordered in (True, False):
+            with ParsePool(workers=workers, chunksize=args.chunksize) as pool:
+                start = time.perf_counter()
+                results = dict(pool.parse_search_pages(search_pages, args.backend, ordered=ordered))
+                search = time.perf_counter() - start
+                start = time.perf_counter()
+                for _ in pool.parse_articles(article_pages, fields, ordered=ordered):
+                    pass
+                articles = time.perf_counter() - start
+            assert [results[page] for page, _ in search_pages] == [result for result, _ in expected]
+            name = f"{workers} processus{'' if ordered else ' (non ordonné)'}"
+            print(f"{name:<24} {args.pages / search:>20.1f} {args.pages / articles:>20.1f}")
+        if workers >= cpu_count:
+            break
+        workers = min(workers * 2, cpu_count)
+    print(f"cœurs disponibles : {cpu_count}")
+
+
+if __name__ == "__main__":
+    main()
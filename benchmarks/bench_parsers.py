@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark des moteurs d'analyse des pages de résultats : vérifie d'abord que tous les
+moteurs renvoient exactement les mêmes annonces sur les pages de test, puis mesure le
+nombre de cartes analysées par seconde pour chacun.
+
+Usage:
+    python -m benchmarks.bench_parsers --pages 20
+"""
+
+import argparse
+import time
+from benchmarks.fixtures import search_page_html
+from src.parsers import PARSER_BACKENDS, parse_search_page
+
+
+def check_parity(pages: list[bytes]):
+    """
+    Compare la sortie de chaque moteur à celle du moteur de référence (html.parser)
+
+    Raises:
+        AssertionError: si un moteur renvoie des annonces différentes
+    """
+    for content in pages:
+        expected = parse_search_page(content, "html.parser")
+        for backend in PARSER_BACKENDS:
+            result = parse_search_page(content, backend)
+            assert result == expected, f"Le moteur {backend} diverge de html.parser"
+
+
+def bench_backend(pages: list[bytes], backend: str) -> float:
+    """
+    Returns:
+        float: nombre de cartes analysées par seconde
+    """
+    cards = 0
+    start = time.perf_counter()
+    for content in pages:
+        cards += len(parse_search_page(content, backend))
+    return cards / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des moteurs d'analyse")
+    parser.add_argument("--pages", type=int, default=20, help="Nombre de pages de résultats analysées")
+    args = parser.parse_args()
+
+    pages = [search_page_html(page, args.pages).encode("utf-8") for page in range(1, args.pages + 1)]
+    check_parity(pages)
+    print("Parité des moteurs vérifiée")
+    for backend in PARSER_BACKENDS:
+        print(f"{backend:<15} {bench_backend(pages, backend):>10.0f} cartes/s")
+
+
+if __name__ == "__main__":
+    main()
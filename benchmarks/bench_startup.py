@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark du démarrage de la ligne de commande : pour chaque commande, durée totale des
+imports mesurée par `python -X importtime` et durée d'exécution de main.py (médiane de
+plusieurs lancements) sur une petite base synthétique, comparées au coût d'import de la
+pile de scrapping (requests, urllib3, BeautifulSoup) que toutes les commandes payaient
+avant les imports paresseux.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.datagen import populate
+from src.cars_dao import CarsDAO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported at startup by main.py before the subcommands
+SCRAPING_STACK = ("src.scrapping", "src.scheduler", "src.backfill")
+
+
+def import_time(args: list[str], cwd: str) -> tuple[float, dict[str, float]]:
+    """
+    Lance `python -X importtime <args>` et additionne les imports de premier niveau
+
+    Returns:
+        tuple[float, dict[str, float]]: durée totale des imports en secondes, et durée
+        cumulée de chaque module de premier niveau
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=cwd, capture_output=True, text=True,
+                            check=True, env={**os.environ, "PYTHONPATH": ROOT})
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that triggered them
+        if not name[1:].startswith(" "):
+            modules[name.strip()] = int(cumulative) / 1e6
+    return sum(modules.values()), modules
+
+
+def run_time(args: list[str], cwd: str, runs: int) -> float:
+    """
+    Médiane de la durée d'exécution de `python <args>`, en secondes
+    """
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=cwd, capture_output=True, check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def prepare(tmp_dir: str, rows: int = 1000) -> str:
+    """
+    Crée une petite base synthétique et une configuration pointant vers elle
+
+    Returns:
+        str: chemin de la configuration
+    """
+    with open(os.path.join(ROOT, "config.json"), encoding='utf-8') as config_file:
+        config = json.load(config_file)
+    config.update(
+        database_path=os.path.join(tmp_dir, "cars.db"),
+        statistics_file=os.path.join(tmp_dir, "statistics.csv"),
+        export={**config.get("export", {}), "directory": os.path.join(tmp_dir, "export"), "formats": ["csv"]},
+        metrics={},
+    )
+    with CarsDAO(config["database_path"]) as cars_dao:
+        populate(cars_dao, rows)
+    config_path = os.path.join(tmp_dir, "config.json")
+    with open(config_path, mode='w', encoding='utf-8') as config_file:
+        json.dump(config, config_file)
+    return config_path
+
+
+def bench_commands(commands: list[str], runs: int, tmp_dir: str) -> dict:
+    """
+    Mesure le démarrage de chaque commande de main.py
+
+    Returns:
+        dict: par commande, durée des imports et durée d'exécution en secondes
+    """
+    config_path = prepare(tmp_dir)
+    main_path = os.path.join(ROOT, "main.py")
+    results = {}
+    for command in commands:
+        args = [main_path, "--config", config_path, command]
+        imports, _ = import_time(args, tmp_dir)
+        results[command] = {"imports": imports, "run": run_time(args, tmp_dir, runs)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage de la ligne de commande")
+    parser.add_argument("--commands", nargs="+", default=["stats", "export"], help="Commandes mesurées")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre de lancements par commande")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stack, _ = import_time(["-c", "import " + ", ".join(SCRAPING_STACK)], tmp_dir)
+        results = bench_commands(args.commands, args.runs, tmp_dir)
+
+    print(f"{'import de la pile de scrapping':<34} {stack * 1000:>8.1f} ms")
+    print(f"{'commande':<12} {'imports (ms)':>14} {'exécution (ms)':>16}")
+    for command, result in results.items():
+        print(f"{command:<12} {result['imports'] * 1000:>14.1f} {result['run'] * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
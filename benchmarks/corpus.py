@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Corpus de pages des benchmarks : pages de résultats et pages d'annonces enregistrées,
+extraites du cache HTTP d'un vrai crawl (une page par fichier, search/*.html et
+article/*.html), ou à défaut pages synthétiques de benchmarks.fixtures.
+
+Usage:
+    python -m benchmarks.corpus --cache http_cache.db --output benchmarks/corpus --limit 200
+"""
+
+import argparse
+import glob
+import os
+from benchmarks.fixtures import article_page_html, search_page_html
+from src.http_cache import ResponseCache
+
+CORPUS_KINDS = {"search": "%/recherche%", "article": "%/ad/%"}
+
+
+def record_corpus(cache_path: str, output_dir: str, limit: int | None = None) -> dict:
+    """
+    Enregistre les pages du cache HTTP dans le répertoire du corpus
+
+    Args:
+        cache_path (str): base du cache HTTP (http_cache.db)
+        output_dir (str): répertoire du corpus
+        limit (int, optional): nombre maximal de pages de chaque type
+
+    Returns:
+        dict: nombre de pages enregistrées par type
+    """
+    # Recorded pages must not be expired when the cache is opened, however old they are
+    cache = ResponseCache(cache_path, max_age=100 * 365 * 86400)
+    counts = {}
+    try:
+        for kind, url_pattern in CORPUS_KINDS.items():
+            directory = os.path.join(output_dir, kind)
+            os.makedirs(directory, exist_ok=True)
+            counts[kind] = 0
+            for _, body, _ in cache.iter_responses(url_pattern):
+                if limit is not None and counts[kind] >= limit:
+                    break
+                with open(os.path.join(directory, f"{counts[kind]:05d}.html"), mode='wb') as page_file:
+                    page_file.write(body)
+                counts[kind] += 1
+    finally:
+        cache.close()
+    return counts
+
+
+def load_corpus(corpus_dir: str | None = None, pages: int = 20) -> dict[str, list[bytes]]:
+    """
+    Charge le corpus enregistré, ou génère `pages` pages synthétiques de chaque type si le
+    répertoire est absent ou vide
+
+    Returns:
+        dict[str, list[bytes]]: pages de résultats ("search") et pages d'annonces ("article")
+    """
+    corpus = {}
+    for kind in CORPUS_KINDS:
+        paths = sorted(glob.glob(os.path.join(glob.escape(corpus_dir), kind, "*.html"))) if corpus_dir else []
+        corpus[kind] = []
+        for path in paths:
+            with open(path, mode='rb') as page_file:
+                corpus[kind].append(page_file.read())
+    if not corpus["search"]:
+        corpus["search"] = [search_page_html(page, pages).encode() for page in range(1, pages + 1)]
+    if not corpus["article"]:
+        corpus["article"] = [article_page_html(i).encode() for i in range(pages)]
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enregistrement du corpus de pages à partir du cache HTTP")
+    parser.add_argument("--cache", default="http_cache.db", help="Base du cache HTTP")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "corpus"), help="Répertoire du corpus")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximal de pages de chaque type")
+    args = parser.parse_args()
+
+    counts = record_corpus(args.cache, args.output, args.limit)
+    print(f"{counts['search']} pages de résultats et {counts['article']} pages d'annonces enregistrées dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
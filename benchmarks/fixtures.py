@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Génération de pages leboncoin synthétiques (pages de résultats et pages d'annonces)
+reproduisant le balisage attendu par les fonctions de scrapping
+"""
+
+import json
+
+PER_PAGE = 35
+
+def _ad(i: int) -> dict:
+    return {
+        "link": f"/ad/voitures/{3100000000 + i}",
+        "title": f"Porsche 911 Carrera {'4S ' if i % 3 else ''}n°{i}",
+        "year": 2008 + i % 15,
+        "current_price": 40000 + (i * 137) % 60000,
+        "mileage": 10000 + (i * 7919) % 190000,
+        "gearbox": "Automatique" if i % 2 else "Manuelle",
+        "original_price": 45000 + (i * 137) % 60000 if i % 3 == 0 else None,
+        "first_publication_date": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} 10:{i % 60:02d}:00",
+    }
+
+def _format_price(price: int) -> str:
+    return f"{price:,}".replace(",", "\u202f") + "\u00a0€"
+
+def card_html(i: int) -> str:
+    """
+    Carte d'annonce telle qu'affichée dans une page de résultats
+    """
+    ad = _ad(i)
+    # Une annonce sur sept n'a pas de prix mis en avant (span sans classe)
+    price_class = "" if i % 7 == 0 else "text-success font-bold"
+    return f"""
+<div class="relative h-[inherit] group/adcard" data-qa-id="aditem_container">
+  <a class="absolute inset-0" aria-label="Voir l’annonce" href="{ad['link']}"></a>
+  <span class="absolute inset-0 opacity-0" title="Voir l’annonce: {ad['title']}"></span>
+  <div class="flex flex-col">
+    <div class="adcard_image"><img src="https://img.leboncoin.fr/{i}.jpg" alt="{ad['title']}"></div>
+    <p class="text-body-1 font-bold">{ad['title']}</p>
+    <div class="flex"><span class="{price_class}">{_format_price(ad['current_price'])}</span></div>
+    <div class="flex gap-sm">
+      <div><p class="text-neutral text-caption">Année</p><p class="text-body-2">{ad['year']}</p></div>
+      <div><p class="text-neutral text-caption">Kilométrage</p><p class="text-body-2">{ad['mileage']} km</p></div>
+      <div><p class="text-neutral text-caption">Carburant</p><p class="text-body-2">Essence</p></div>
+      <div><p class="text-neutral text-caption">Boîte de vitesse</p><p class="text-body-2">{ad['gearbox']}</p></div>
+    </div>
+    <p class="text-caption text-neutral">Paris 75011</p>
+  </div>
+</div>"""
+
+def _ad_json(i: int) -> dict:
+    ad = _ad(i)
+    attributes = [
+        {"key": "regdate", "value": str(ad["year"]), "value_label": str(ad["year"])},
+        {"key": "mileage", "value": str(ad["mileage"]), "value_label": f"{ad['mileage']} km"},
+        {"key": "gearbox", "value": "2" if i % 2 else "1", "value_label": ad["gearbox"]},
+        {"key": "fuel", "value": "1", "value_label": "Essence"},
+    ]
+    if ad["original_price"]:
+        attributes.append({"key": "old_price", "value": str(ad["original_price"]), "value_label": f"{ad['original_price']} €"})
+    return {
+        "list_id": 3100000000 + i,
+        "subject": ad["title"],
+        "url": f"https://www.leboncoin.fr{ad['link']}",
+        "price": [ad["current_price"]],
+        "first_publication_date": ad["first_publication_date"],
+        "index_date": ad["first_publication_date"],
+        "attributes": attributes,
+    }
+
+def search_page_html(page: int, pages: int, per_page: int = PER_PAGE, base_path: str = "/recherche") -> str:
+    """
+    Page de résultats n°`page` (à partir de 1) d'une recherche de `pages` pages
+    """
+    first = (page - 1) * per_page
+    cards = "".join(card_html(i) for i in range(first, first + per_page))
+    next_link = f'<a aria-label="Page suivante" href="{base_path}?page={page + 1}">Suivant</a>' if page < pages else ""
+    next_data = {"props": {"pageProps": {"searchData": {"ads": [_ad_json(i) for i in range(first, first + per_page)]}}}}
+    return f"""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>Voitures - leboncoin</title>
+<script>window.dataLayer = window.dataLayer || [];</script></head>
+<body><header><nav><a href="/">leboncoin</a></nav></header>
+<main><div class="grid">{cards}</div>
+<nav aria-label="Pagination">{next_link}</nav></main>
+<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script>
+</body></html>"""
+
+def article_page_html(i: int) -> str:
+    """
+    Page de détail de l'annonce n°`i`
+    """
+    ad = _ad(i)
+    next_data = {"props": {"pageProps": {"ad": _ad_json(i)}}}
+    return f"""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>{ad['title']} - leboncoin</title></head>
+<body><main><h1>{ad['title']}</h1><p>{_format_price(ad['current_price'])}</p>
+<div class="description">{'Très bon état, carnet d’entretien complet. ' * 20}</div></main>
+<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script>
+</body></html>"""
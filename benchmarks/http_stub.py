@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Serveur HTTP local imitant leboncoin pour les benchmarks : pages de résultats et pages
+d'annonces synthétiques (benchmarks.fixtures) ou enregistrées, ETag et requêtes
+conditionnelles, latence simulée et limitation de débit côté serveur. Au-delà de
+`capacity` requêtes par seconde (seau de jetons de `burst` requêtes), le serveur répond
+429 avec un en-tête Retry-After, ou une page de blocage si `block` est vrai.
+
+Usage:
+    python -m benchmarks.http_stub --port 8765 --pages 20 --capacity 5 --latency 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from benchmarks.fixtures import article_page_html, search_page_html
+
+# First ad id used by benchmarks.fixtures in the ad links
+FIRST_AD_ID = 3100000000
+
+BLOCK_PAGE = b'<html><body><script src="https://geo.captcha-delivery.com/captcha/"></script></body></html>'
+
+
+class StubServer:
+    """
+    Serveur local démarré dans un thread, utilisable comme gestionnaire de contexte
+    """
+
+    def __init__(self, port: int = 0, pages: int = 20, capacity: float | None = None, burst: int = 5,
+                 latency: float = 0.0, retry_after: float = 1.0, block: bool = False, routes: dict | None = None):
+        """
+        Args:
+            port (int, optional): port d'écoute (0 : port libre choisi par le système)
+            pages (int, optional): nombre de pages de résultats de la recherche
+            capacity (float, optional): débit accepté en requêtes par seconde (None : illimité)
+            burst (int, optional): nombre de requêtes acceptées d'affilée
+            latency (float, optional): latence ajoutée à chaque réponse, en secondes
+            retry_after (float, optional): valeur de l'en-tête Retry-After des réponses 429
+            block (bool, optional): répond par une page de blocage plutôt que par un 429
+            routes (dict, optional): pages servies telles quelles, par chemin (ex : pages enregistrées)
+        """
+        self.pages = pages
+        self.capacity = capacity
+        self.burst = burst
+        self.latency = latency
+        self.retry_after = retry_after
+        self.block = block
+        self.stats = {"requests": 0, "throttled": 0, "not_modified": 0}
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self._cache = dict(routes or {})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self) -> bool:
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.capacity is None:
+                return True
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.capacity)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.stats["throttled"] += 1
+            return False
+
+    def _page(self, path: str) -> bytes | None:
+        body = self._cache.get(path)
+        if body is None:
+            url = urlparse(path)
+            if url.path.startswith("/ad/"):
+                body = article_page_html(int(url.path.rsplit("/", 1)[1]) - FIRST_AD_ID).encode()
+            elif url.path.startswith("/recherche"):
+                page = int(parse_qs(url.query).get("page", ["1"])[0])
+                if page > self.pages:
+                    return None
+                body = search_page_html(page, self.pages).encode()
+            else:
+                return None
+            self._cache[path] = body
+        return body
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    return self._send(200, json.dumps(stub.stats).encode(), {"Content-Type": "application/json"})
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if not stub._admit():
+                    if stub.block:
+                        return self._send(403, BLOCK_PAGE, {"Content-Type": "text/html"})
+                    return self._send(429, headers={"Retry-After": f"{stub.retry_after:g}"})
+                body = stub._page(self.path)
+                if body is None:
+                    return self._send(404)
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    stub.stats["not_modified"] += 1
+                    return self._send(304, headers={"ETag": etag})
+                self._send(200, body, {"ETag": etag, "Content-Type": "text/html; charset=utf-8"})
+
+        return Handler
+
+    def start(self) -> 'StubServer':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'StubServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur HTTP local imitant leboncoin")
+    parser.add_argument("--port", type=int, default=8765, help="Port d'écoute")
+    parser.add_argument("--pages", type=int, default=20, help="Nombre de pages de résultats")
+    parser.add_argument("--capacity", type=float, default=None, help="Débit accepté en requêtes par seconde")
+    parser.add_argument("--burst", type=int, default=5, help="Nombre de requêtes acceptées d'affilée")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence ajoutée à chaque réponse (s)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After des réponses 429 (s)")
+    parser.add_argument("--block", action="store_true", help="Page de blocage plutôt que 429")
+    args = parser.parse_args()
+
+    stub = StubServer(args.port, args.pages, args.capacity, args.burst, args.latency, args.retry_after, args.block)
+    print(f"Serveur à l'écoute sur {stub.url}/recherche")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
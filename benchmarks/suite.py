@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks du chemin téléchargement → analyse → écriture en base. Les résultats
+sont écrits en JSON (un fichier par commit) pour pouvoir comparer deux commits et
+repérer une baisse de débit avant un déploiement :
+  - http : url_scrapper contre le serveur local benchmarks.http_stub
+  - parse : results_scrapper/results_scrapper_detail, search_json_scrapper et
+    article_scrapper sur le corpus (benchmarks.corpus)
+  - dao : CarsDAO (insertion, mise à jour, statistiques, lecture) de 10 000 à 1 000 000 d'annonces
+  - e2e : main.py grab de bout en bout contre le serveur local
+  - startup : lancement de main.py stats (imports mesurés par python -X importtime)
+Chaque mesure est un débit ; les mesures sans effet de bord gardent la meilleure de
+--repeat exécutions. Avec --compare, les débits en baisse de plus de --tolerance par
+rapport au fichier de référence sont signalés et le code de sortie vaut 1.
+
+Usage:
+    python -m benchmarks.suite --rows 10000 100000 1000000
+    python -m benchmarks.suite --groups parse dao --compare benchmarks/results/1a2b3c4.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from bs4 import BeautifulSoup
+from benchmarks.corpus import load_corpus
+from benchmarks.datagen import synthetic_cars
+from benchmarks.bench_startup import bench_commands
+from benchmarks.http_stub import StubServer
+from src.cars_dao import CarsDAO
+from src.config import load_config
+from src.parsers import CARD_CLASS, CARD_FIELDS, CARD_TAG
+from src.pipeline import parse_announcements
+from src.scrapping import article_scrapper, results_scrapper, results_scrapper_detail, url_scrapper
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GROUPS = ("http", "parse", "dao", "e2e", "startup")
+
+# Fields read from the ad pages by the original price backfill
+ARTICLE_FIELDS = ["old_price", "first_publication_date"]
+
+# Ads per upsert_cars call, as for a results page
+PAGE_SIZE = 35
+
+
+def _result(count: int, seconds: float, unit: str) -> dict:
+    return {"throughput": round(count / seconds, 3), "unit": unit, "count": count, "seconds": round(seconds, 6)}
+
+
+def measure(function, unit: str, repeat: int = 1) -> dict:
+    """
+    Exécute `function` (qui renvoie le nombre d'unités traitées) `repeat` fois et garde la
+    plus rapide
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[1]:
+            best = (count, elapsed)
+    return _result(best[0], best[1], unit)
+
+
+def bench_http(corpus: dict, repeat: int) -> dict:
+    routes = {f"/corpus/{i}": page for i, page in enumerate(corpus["search"])}
+    with StubServer(routes=routes) as stub:
+        urls = [f"{stub.url}{path}" for path in routes]
+
+        def run():
+            for url in urls:
+                if url_scrapper(url) is None:
+                    raise RuntimeError(f"Page inaccessible : {url}")
+            return len(urls)
+
+        return {"url_scrapper": measure(run, "pages/s", repeat)}
+
+
+def bench_parse(corpus: dict, repeat: int) -> dict:
+    def cards():
+        count = 0
+        for content in corpus["search"]:
+            soup = BeautifulSoup(content, "html.parser")
+            for article in results_scrapper(soup, CARD_TAG, CARD_CLASS):
+                results_scrapper_detail(article, CARD_FIELDS)
+                count += 1
+        return count
+
+    def search_json():
+        return sum(len(parse_announcements(content, json_first=True)) for content in corpus["search"])
+
+    def articles():
+        for content in corpus["article"]:
+            article_scrapper(BeautifulSoup(content, "html.parser"), ARTICLE_FIELDS)
+        return len(corpus["article"])
+
+    return {
+        "results_scrapper_detail": measure(cards, "annonces/s", repeat),
+        "search_json_scrapper": measure(search_json, "annonces/s", repeat),
+        "article_scrapper": measure(articles, "pages/s", repeat),
+    }
+
+
+def _upsert_all(cars_dao: CarsDAO, rows: int, price_change: float = 0.0) -> float:
+    # Only the database writes are timed, not the generation of the Cars objects
+    elapsed = 0.0
+    for start in range(0, rows, PAGE_SIZE):
+        cars = synthetic_cars(min(PAGE_SIZE, rows - start), start, seed=start)
+        for car in cars:
+            car.current_price += price_change
+        begin = time.perf_counter()
+        cars_dao.upsert_cars(cars)
+        elapsed += time.perf_counter() - begin
+    return elapsed
+
+
+def bench_dao(rows: int, tmp_dir: str) -> dict:
+    results = {}
+    with CarsDAO(os.path.join(tmp_dir, f"cars-{rows}.db")) as cars_dao:
+        results[f"cars_dao.insert[{rows}]"] = _result(rows, _upsert_all(cars_dao, rows), "annonces/s")
+        results[f"cars_dao.update[{rows}]"] = _result(rows, _upsert_all(cars_dao, rows, price_change=500.0), "annonces/s")
+        results[f"cars_dao.statistics[{rows}]"] = measure(lambda: (cars_dao.calculate_statistics(), rows)[1], "annonces/s")
+        results[f"cars_dao.duration_variation[{rows}]"] = measure(
+            lambda: (cars_dao.calculate_duration_on_site_and_price_variation(), rows)[1], "annonces/s")
+        results[f"cars_dao.iter_cars[{rows}]"] = measure(lambda: sum(1 for _ in cars_dao.iter_cars()), "annonces/s")
+    return results
+
+
+def bench_grab_data(pages: int, tmp_dir: str) -> dict:
+    """
+    Lance main.py grab dans un sous-processus (démarrage compris), avec une copie de
+    config.json pointant vers le serveur local, sans cache HTTP ni limiteur de débit
+    """
+    config_path = os.path.join(tmp_dir, "config.json")
+    report_path = os.path.join(tmp_dir, "run_report.json")
+    with StubServer(pages=pages) as stub:
+        config = load_config(os.path.join(ROOT, "config.json"))
+        config.pop("rate_limit", None)
+        config.update(
+            base_url=stub.url,
+            url=f"{stub.url}/recherche?page=1&u_car_brand=?&u_car_model=?",
+            database_path=os.path.join(tmp_dir, "grab.db"),
+            http_cache={**config.get("http_cache", {}), "enabled": False},
+            incremental={**config.get("incremental", {}), "enabled": False},
+            metrics={"report_file": report_path},
+        )
+        with open(config_path, mode='w', encoding='utf-8') as config_file:
+            json.dump(config, config_file)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--config", config_path, "grab"],
+                       cwd=tmp_dir, check=True, capture_output=True)
+        elapsed = time.perf_counter() - start
+    with open(report_path, encoding='utf-8') as report_file:
+        counters = json.load(report_file)["counters"]
+    return {"grab_data": _result(counters.get("http_requests_total", 0), elapsed, "pages/s")}
+
+
+def bench_startup(repeat: int, tmp_dir: str) -> dict:
+    startup_dir = os.path.join(tmp_dir, "startup")
+    os.makedirs(startup_dir)
+    startup = bench_commands(["stats"], repeat, startup_dir)["stats"]
+    return {
+        "startup.stats": _result(1, startup["run"], "lancements/s"),
+        "startup.stats.imports": _result(1, startup["imports"], "lancements/s"),
+    }
+
+
+def git_commit() -> str:
+    """
+    Commit courant (suffixé par -dirty si l'arbre de travail est modifié)
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, check=True,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def compare(previous: dict, current: dict, tolerance: float) -> list[str]:
+    """
+    Affiche les débits des deux exécutions et renvoie les mesures en baisse de plus de
+    `tolerance` (proportion)
+    """
+    regressions = []
+    print(f"\n{'mesure':<40} {previous['commit']:>14} {current['commit']:>14} {'rapport':>8}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["throughput"] / before["throughput"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  <- régression"
+        print(f"{name:<40} {before['throughput']:>14.1f} {result['throughput']:>14.1f} {ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks scrapping → analyse → base")
+    parser.add_argument("--groups", nargs="+", choices=GROUPS, default=list(GROUPS), help="Groupes de mesures")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="Tailles de table pour CarsDAO")
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "benchmarks", "corpus"),
+                        help="Répertoire du corpus enregistré (pages synthétiques s'il est absent)")
+    parser.add_argument("--pages", type=int, default=20, help="Nombre de pages synthétiques de chaque type")
+    parser.add_argument("--grab-pages", type=int, default=50, help="Nombre de pages de résultats du crawl de bout en bout")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre d'exécutions des mesures sans effet de bord")
+    parser.add_argument("--output", help="Fichier de résultats (par défaut benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Baisse de débit tolérée (proportion)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.pages)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if "http" in args.groups:
+            results.update(bench_http(corpus, args.repeat))
+        if "parse" in args.groups:
+            results.update(bench_parse(corpus, args.repeat))
+        if "dao" in args.groups:
+            for rows in args.rows:
+                results.update(bench_dao(rows, tmp_dir))
+        if "e2e" in args.groups:
+            results.update(bench_grab_data(args.grab_pages, tmp_dir))
+        if "startup" in args.groups:
+            results.update(bench_startup(args.repeat, tmp_dir))
+
+    for name, result in results.items():
+        print(f"{name:<40} {result['throughput']:>14.1f} {result['unit']:<11} ({result['seconds']:.3f} s)")
+
+    current = {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.platform(),
+        "corpus": {kind: len(pages) for kind, pages in corpus.items()},
+        "results": results,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{current['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, mode='w', encoding='utf-8') as output_file:
+        json.dump(current, output_file, indent=4, ensure_ascii=False)
+    print(f"Résultats écrits : {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous_file:
+            previous = json.load(previous_file)
+        if compare(previous, current, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
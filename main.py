@@ -2,189 +2,363 @@
 """
 Point d'entrée principal du programme de scrapping des annonce de voitures
 
+Chaque commande n'importe que les modules dont elle a besoin : les statistiques et les
+exports, lancés souvent (cron, tableau de bord), ne chargent ni requests ni BeautifulSoup.
+
 Usage:
-    python main.py --url1
-    python main.py --url2
+    python main.py grab [--incremental] [--replay]
+    python main.py stats
+    python main.py analytics
+    python main.py export
+    python main.py reparse
+    python main.py query --brand porsche --model porsche_911 --text GTS --price-max 90000
+    python main.py changes --consumer alertes --kind new price
+    python main.py --grab-data --calculate-stats    (anciennes options, toujours acceptées)
 """
 
 # Dependencies
 import logging
 import argparse
-import time
 import os
+import sys
 from src.config import load_config
-from src.scrapping import url_scrapper, results_scrapper, results_scrapper_detail, article_scrapper
-from src.cars import Cars
-from src.cars_dao import CarsDAO
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Legacy option -> command; several options run their commands in this order
+LEGACY_FLAGS = {
+    "grab_data": "grab",
+    "reparse": "reparse",
+    "calculate_stats": "stats",
+    "analytics": "analytics",
+    "export": "export",
+}
 
 # Logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('scrapping.log'),
-        logging.StreamHandler()
-    ]
-)
+def configure_logging(log_file: str | None = None):
+    """
+    Configure les logs sur la sortie d'erreur et, pour le scrapping, dans un fichier
+
+    Args:
+        log_file (str, optional): fichier de logs (ex : scrapping.log)
+    """
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, handlers=handlers)
 
 # Parsing Method
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     """
     Parse les arguments de ligne de commande
-    
+
     Returns:
         argparse.Namespace: Arguments parsés
     """
     parser = argparse.ArgumentParser(
         description="Scrapping des annonces de voitures"
     )
-    
+
     parser.add_argument(
-        "--grab-data",
+        "--config",
+        default=os.path.join(os.path.dirname(__file__), "config.json"),
+        help="Fichier de configuration (par défaut, config.json à côté de main.py)"
+    )
+
+    subparsers = parser.add_subparsers(dest="command", metavar="commande")
+    grab = subparsers.add_parser("grab", help="Lance le scrapping pour le site LeBonCoin.fr")
+    # No default in the subcommand, so that it does not hide the same legacy option given before it
+    grab.add_argument(
+        "--incremental",
         action="store_true",
-        help="Lance le scrapping pour le site LeBonCoin.fr"
+        default=argparse.SUPPRESS,
+        help="Crawl incrémental : s'arrête dès que les pages ne contiennent plus que des annonces connues et inchangées"
     )
-    
-    parser.add_argument(
-        "--calculate-stats",
+    grab.add_argument(
+        "--replay",
         action="store_true",
-        help="Calcule les statistiques sur les données scrappées"
+        default=argparse.SUPPRESS,
+        help="Rejoue le scrapping hors ligne à partir du cache HTTP, sans accès au réseau"
     )
-    
-    return parser.parse_args()
+    subparsers.add_parser("stats", help="Calcule les statistiques sur les données scrappées")
+    subparsers.add_parser("analytics", help="Calcule les percentiles de prix, la décote par modèle et les annonces sous le prix du marché")
+    subparsers.add_parser("export", help="Exporte la table des annonces (CSV, Parquet ou Arrow), partitionnée par marque et modèle")
+    subparsers.add_parser("reparse", help="Analyse de nouveau les pages de résultats du cache HTTP dans un pool de processus")
+    query = subparsers.add_parser("query", help="Recherche des annonces par critères et mots du titre, page par page")
+    query.add_argument("--text", help="Mots du titre (ex : GTS, Targa)")
+    query.add_argument("--brand", type=str.upper, help="Marque (ex : PORSCHE)")
+    query.add_argument("--model", type=str.upper, help="Modèle (ex : PORSCHE_911)")
+    query.add_argument("--year-min", type=int, help="Année minimale")
+    query.add_argument("--year-max", type=int, help="Année maximale")
+    query.add_argument("--price-min", type=float, help="Prix minimal")
+    query.add_argument("--price-max", type=float, help="Prix maximal")
+    query.add_argument("--mileage-min", type=int, help="Kilométrage minimal")
+    query.add_argument("--mileage-max", type=int, help="Kilométrage maximal")
+    query.add_argument("--gearbox", help="Boîte de vitesse (ex : Automatique)")
+    query.add_argument("--include-removed", action="store_true", help="Inclut les annonces retirées du site")
+    query.add_argument("--sort", choices=["price", "year", "mileage"], default="price", help="Tri des annonces")
+    query.add_argument("--desc", action="store_true", help="Tri décroissant")
+    query.add_argument("--limit", type=int, default=20, help="Nombre d'annonces par page")
+    query.add_argument("--after", type=parse_cursor, help="Curseur de la page suivante, affiché à la fin de la page précédente")
+    changes = subparsers.add_parser("changes", help="Affiche en JSON (une ligne par changement) les nouvelles annonces, changements de prix et retraits")
+    changes.add_argument("--consumer", help="Consommateur : lit à partir de son curseur et l'avance après l'affichage")
+    changes.add_argument("--after", type=int, help="Numéro de séquence du dernier changement déjà traité (remplace le curseur)")
+    changes.add_argument("--kind", nargs="+", choices=["new", "price", "removed", "relisted"], help="Types de changements affichés")
+    changes.add_argument("--limit", type=int, help="Nombre maximal de changements affichés")
+    changes.add_argument("--purge", action="store_true", help="Supprime ensuite les changements traités par tous les consommateurs")
+
+    legacy = parser.add_argument_group("anciennes options (équivalentes aux commandes)")
+    legacy.add_argument("--grab-data", action="store_true", help="Équivaut à la commande grab")
+    legacy.add_argument("--calculate-stats", action="store_true", help="Équivaut à la commande stats")
+    legacy.add_argument("--analytics", action="store_true", help="Équivaut à la commande analytics")
+    legacy.add_argument("--export", action="store_true", help="Équivaut à la commande export")
+    legacy.add_argument("--reparse", action="store_true", help="Équivaut à la commande reparse")
+    legacy.add_argument("--incremental", action="store_true", help="Équivaut à grab --incremental")
+    legacy.add_argument("--replay", action="store_true", help="Équivaut à grab --replay")
+
+    return parser.parse_args(argv)
+
+def parse_cursor(value: str) -> tuple[float, int]:
+    """
+    Convertit le curseur de pagination "valeur:id" affiché par la commande query
+    """
+    sort_value, _, car_id = value.rpartition(":")
+    try:
+        return float(sort_value), int(car_id)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Curseur invalide : {value} (attendu : valeur:id)")
+
+def commands_from_args(args: argparse.Namespace) -> list[str]:
+    """
+    Commandes à exécuter : la sous-commande, ou celles des anciennes options
+    """
+    if args.command:
+        return [args.command]
+    return [command for flag, command in LEGACY_FLAGS.items() if getattr(args, flag)]
+
+# Commands (each one imports its own dependencies)
+def run_grab(config: dict, cars_dao, args: argparse.Namespace):
+    from src.scrapping import Scraper
+    from src.scheduler import crawl_searches, load_searches
+    from src.backfill import run_backfill
+    from src.cars_dao import MISSING_ORIGINAL_PRICE
+
+    logging.info("Démarrage du scrapping pour le site LeBonCoin.fr")
+    # Get values from config
+    searches = load_searches(config)
+    incremental_config = config.get("incremental", {})
+    incremental = args.incremental or incremental_config.get("enabled", False)
+    # The incremental mode needs results sorted from the most recent to the oldest
+    url = incremental_config.get("url", config.get("url")) if incremental else config.get("url")
+    if url is None:
+        logging.error("URL de base non trouvée dans la configuration")
+        return
+    # Offline replay: every page is served from the HTTP cache
+    if args.replay:
+        config["http_cache"] = {**config.get("http_cache", {}), "enabled": True, "replay": True}
+        logging.info("Mode rejeu : les pages sont lues dans le cache HTTP")
+    # One HTTP client (and connection pool) for the whole crawl, rate limited to avoid being blocked
+    scraper = Scraper.from_config(config)
+    # Crawl every search; for each of them download, parsing and database writes overlap
+    try:
+        crawl_searches(
+            scraper,
+            cars_dao,
+            url,
+            searches,
+            workers=config.get("workers", 2),
+            queue_size=config.get("pipeline", {}).get("queue_size", 2),
+            parser_backend=config.get("parser", "html.parser"),
+            json_first=config.get("json_first", True),
+            incremental=incremental,
+            stop_after_pages=incremental_config.get("stop_after_pages", 1)
+        )
+    except ValueError as e:
+        logging.error(f"Arrêt du programme : {e}")
+        scraper.close()
+        return
+    # Find missing original prices and update them in the database
+    logging.info("Vérification des prix originaux manquants")
+    logging.info(f"Nombre d'annonces sans prix original : {cars_dao.count_cars(MISSING_ORIGINAL_PRICE)}")
+    backfill_config = config.get("backfill", {})
+    # The ads are streamed from the database, a batch at a time
+    updated, failed = run_backfill(
+        scraper,
+        cars_dao,
+        cars_dao.iter_cars_missing_original_price(),
+        concurrency=backfill_config.get("concurrency", 4),
+        batch_size=backfill_config.get("batch_size", 50)
+    )
+    logging.info(f"Prix originaux mis à jour : {updated} - Pages inaccessibles : {failed}")
+    scraper.close()
+
+def run_reparse(config: dict, cars_dao, args: argparse.Namespace):
+    # Reparse the cached result pages, e.g. after a markup change, on every core
+    from src.http_cache import ResponseCache
+    from src.parse_pool import ParsePool, reparse_cached_pages
+
+    logging.info("Analyse des pages de résultats du cache HTTP")
+    cache = ResponseCache.from_config(config.get("http_cache", {}))
+    with ParsePool.from_config(config.get("parse_pool", {})) as pool:
+        reparse_cached_pages(
+            cache,
+            cars_dao,
+            pool,
+            parser_backend=config.get("parser", "html.parser"),
+            json_first=config.get("json_first", True)
+        )
+    cache.close()
+
+def run_stats(config: dict, cars_dao, args: argparse.Namespace):
+    logging.info("Démarrage du calcul des statistiques sur les données scrappées")
+    statistics = cars_dao.calculate_statistics()
+    for stat, value in statistics.items():
+        logging.info(f"{stat} : {value}")
+    logging.info("Statistiques calculées avec succès")
+    # Export statistics to a csv file
+    stats_file = config.get("statistics_file", "statistics.csv")
+    cars_dao.export_statistics_to_csv(statistics, stats_file)
+    logging.info(f"Fichier de statistiques exporté : {stats_file}")
+    # Calculate price variation and duration on site for each car
+    logging.info("Calcul de la variation des prix et de la durée de présence sur le site pour chaque annonce")
+    updated = cars_dao.calculate_duration_on_site_and_price_variation()
+    logging.info(f"Variation des prix et durée de présence sur le site calculés avec succès ({updated} annonces dont la durée ou la variation a changé)")
+
+def run_analytics(config: dict, cars_dao, args: argparse.Namespace):
+    # Vectorized analytics (numpy is only needed for this step)
+    from src.analytics import analyse, export_analytics_to_csv
+
+    logging.info("Démarrage des analyses sur les données scrappées")
+    analytics_config = config.get("analytics", {})
+    results = analyse(cars_dao, underpriced_threshold=analytics_config.get("underpriced_threshold", 2.0))
+    for name, rows in results.items():
+        output_file = analytics_config.get(f"{name}_file", f"{name}.csv")
+        export_analytics_to_csv(rows, output_file)
+        logging.info(f"Analyse {name} exportée : {output_file} ({len(rows)} lignes)")
+
+def run_export(config: dict, cars_dao, args: argparse.Namespace):
+    # Raw export of the cars table, streamed in chunks
+    from src.export import export_cars
+
+    export_config = config.get("export", {})
+    try:
+        export_cars(
+            cars_dao,
+            export_config.get("directory", "export"),
+            formats=tuple(export_config.get("formats", ["csv"])),
+            partition_by=tuple(export_config.get("partition_by", ["brand", "model"])),
+            incremental=export_config.get("incremental", False),
+            batch_size=export_config.get("batch_size", 10000)
+        )
+    except ValueError as e:
+        logging.error(f"Export impossible : {e}")
+
+def run_query(config: dict, cars_dao, args: argparse.Namespace):
+    from src.cars import Cars
+
+    rows, cursor = cars_dao.search_cars(
+        text=args.text,
+        brand=args.brand,
+        model=args.model,
+        year_min=args.year_min,
+        year_max=args.year_max,
+        price_min=args.price_min,
+        price_max=args.price_max,
+        mileage_min=args.mileage_min,
+        mileage_max=args.mileage_max,
+        gearbox=args.gearbox,
+        include_removed=args.include_removed,
+        order_by=args.sort,
+        descending=args.desc,
+        after=args.after,
+        limit=args.limit
+    )
+    # Results go to stdout, logs to stderr: the output can be piped
+    for row in rows:
+        print(Cars.from_row(row))
+    if cursor is not None:
+        print(f"Page suivante : --after {cursor[0]}:{cursor[1]}")
+
+def run_changes(config: dict, cars_dao, args: argparse.Namespace):
+    import itertools
+    import json
+
+    if args.after is not None:
+        after = args.after
+    else:
+        after = cars_dao.get_change_cursor(args.consumer) if args.consumer else 0
+    changes = cars_dao.iter_changes(after, args.kind)
+    if args.limit is not None:
+        changes = itertools.islice(changes, args.limit)
+    last, count = after, 0
+    for change in changes:
+        print(json.dumps(change._asdict(), default=str, ensure_ascii=False))
+        last, count = change.seq, count + 1
+    # The cursor only moves once the changes are written out: a consumer that fails reads them again
+    if args.consumer and last > after:
+        cars_dao.set_change_cursor(args.consumer, last)
+    logging.info(f"{count} changements lus après le n°{after}" + (f", curseur de {args.consumer} : {last}" if args.consumer else ""))
+    if args.purge:
+        logging.info(f"{cars_dao.purge_changes()} changements traités supprimés du journal")
+
+COMMANDS = {
+    "grab": run_grab,
+    "reparse": run_reparse,
+    "stats": run_stats,
+    "analytics": run_analytics,
+    "export": run_export,
+    "query": run_query,
+    "changes": run_changes,
+}
 
 # Main Method
-def main():
+def main(argv: list[str] | None = None):
     # Parse command line arguments
-    args = parse_args()
-    
-    if not args.grab_data and not args.calculate_stats:
-        logging.warning("Aucun paramètre spécifié. Veuillez utiliser --grab-data ou --calculate-stats.")
-        print("Usage: python src/main.py --grab-data ou python src/main.py --calculate-stats")
+    args = parse_args(argv)
+    commands = commands_from_args(args)
+
+    # Only the scraping keeps a log file; the other commands are run too often for it
+    configure_logging("scrapping.log" if "grab" in commands else None)
+
+    if not commands:
+        logging.warning("Aucune commande spécifiée. Veuillez utiliser grab, stats, analytics, export, reparse, query ou changes.")
+        print("Usage: python main.py grab ou python main.py stats")
         return
 
     try:
+        from src.cars_dao import CarsDAO
+        from src.metrics import metrics
+
         logging.info("Démarrage du programme de scrapping des annonces de voitures")
 
         # Load the configuration
         logging.info("Chargement de la configuration")
-        config = load_config(os.path.join(os.path.dirname(__file__), "config.json"))
+        config = load_config(args.config)
         logging.info("Configuration chargée avec succès")
 
         # Initialize database connection if needed and create the cars table
         database_path = config.get("database_path", "cars.db")
         logging.info(f"Initialisation de la base de données à {database_path}")
-        cars_dao = CarsDAO(database_path)
-
-        # Scrapping
-        if args.grab_data:
-            logging.info("Démarrage du scrapping pour le site LeBonCoin.fr")
-            # Get values from config
-            brand_filter = config.get("brand_filter", "")
-            model_filter = config.get("model_filter", "")
-            url = config.get("url")
-            if url is None:
-                logging.error("URL de base non trouvée dans la configuration")
-                return
-            url = url.replace("u_car_brand=?", f"u_car_brand={brand_filter}").replace("u_car_model=?", f"u_car_model={model_filter}")
-            # Call the scrapping function
-            # Loop through pages until url is None
-            while url:
-                logging.info(f"Scrapping de la page : {url}")
-                # Get the BeautifulSoup content of the page
-                page_content = url_scrapper(url)
-                # Get next page link if exists
-                try:
-                    next_page = page_content.find("a", attrs={"aria-label": "Page suivante"}).get("href")
-                    next_page = "https://www.leboncoin.fr" + next_page
-                    url = next_page
-                except AttributeError:
-                    next_page = None
-                    url = next_page
-                # List the articles in the page
-                # articles = results_scrapper(page_content, "article", "relative h-[inherit] group/adcard")
-                articles = results_scrapper(page_content, "div", "relative h-[inherit] group/adcard")
-                logging.info(f"Nombre d'annonces trouvées sur la page : {len(articles)}")
-                # Initialize list to store car objects
-                list_car = []
-                # Parse each article in the page
-                for article in articles:
-                    try:
-                        announcement = results_scrapper_detail(article, ["link", "title", "year", "current_price", "mileage", "gearbox"])
-                    except ValueError as e:
-                        logging.error(f"Arrêt du programme : {e}")
-                        logging.error(f"Article concerné : {article}")
-                        return
-                    # Merge both dictionaries
-                    # Init car object with values of announcement    
-                    car = Cars.from_dict(announcement)
-                    car.brand = brand_filter
-                    car.model = model_filter
-                    #logging.info(f"Annonce scrappée : {car}")
-                    # Store car objects in a list
-                    list_car.append(car)
-                # Insert cars into database
-                for car in list_car:
-                    # Check if car already exists in database to avoid duplicates
-                    existing_cars = cars_dao.get_all_cars()
-                    if any(existing_car.link == car.link for existing_car in existing_cars):
-                        logging.info(f"L'annonce existe déjà dans la base de données : {car.link}. Mise à jour du prix de l'annonce en BDD.")
-                        cars_dao.update_car_current_price(car.link, car.current_price)
-                        continue
-                    else:
-                        cars_dao.insert_car(car)
-                # Pause between page requests to avoid being blocked
-                time.sleep(2)
-            # Find missing original prices and update them in the database
-            logging.info("Vérification des prix originaux manquants")
-            all_cars = cars_dao.get_all_cars()
-            for car in all_cars:
-                if car.original_price is None or car.original_price == 0.0:
-                    logging.info(f"Recherche du prix original pour l'annonce : {car.link}")
-                    # Scrape the article page to find the original price and first publication date
-                    url = "https://www.leboncoin.fr" + car.link
-                    article_page = url_scrapper(url)
-                    if article_page is None:
-                        logging.error(f"Impossible de récupérer la page de l'annonce : {car.link}")
-                        continue
-                    #original_price, first_publication_date = article_scrapper_find_old_price_and_first_publication_date(article_page)
-                    article_dict = article_scrapper(article_page, ["old_price", "first_publication_date"])
-                    original_price = article_dict.get("old_price")
-                    first_publication_date = article_dict.get("first_publication_date")
-                    if original_price:
-                        car.original_price = original_price
-                        cars_dao.update_car(car)
-                        logging.info(f"Prix original mis à jour pour l'annonce : {car.link} - Prix original : {car.original_price}€")
-                    else:
-                        car.original_price = car.current_price
-                        cars_dao.update_car(car)
-                        logging.info(f"Prix original mis à jour avec prix courant pour l'annonce : {car.link} - Prix original : {car.original_price}€")
-                    if first_publication_date:
-                        car.first_publication_date = first_publication_date
-                        cars_dao.update_car_first_publication_date(car.link, first_publication_date)
-                        logging.info(f"Date de première publication trouvée pour l'annonce : {car.link} - Date : {first_publication_date}")
-                    # Pause between requests
-                    time.sleep(2)
-        
-        # Calculate statistics
-        if args.calculate_stats:
-            logging.info("Démarrage du calcul des statistiques sur les données scrappées")
-            statistics = cars_dao.calculate_statistics()
-            for stat, value in statistics.items():
-                logging.info(f"{stat} : {value}")
-            logging.info("Statistiques calculées avec succès")
-            # Export statistics to a csv file
-            stats_file = config.get("statistics_file", "statistics.csv")
-            cars_dao.export_statistics_to_csv(statistics, stats_file)
-            logging.info(f"Fichier de statistiques exporté : {stats_file}")
-            # Calculate price variation and duration on site for each car
-            logging.info("Calcul de la variation des prix et de la durée de présence sur le site pour chaque annonce")
-            cars_dao.calculate_duration_on_site_and_price_variation()
-            logging.info("Variation des prix et durée de présence sur le site calculés avec succès pour chaque annonce")
-    
+        cars_dao = CarsDAO(database_path, cache_size_mb=config.get("database_cache_mb", 20))
+
+        for command in commands:
+            COMMANDS[command](config, cars_dao, args)
+
+        cars_dao.close()
+
+        # Run report: per-stage timings and counters, to compare crawls with each other (the
+        # other commands do not overwrite the report of the last crawl)
+        metrics_config = config.get("metrics", {})
+        crawled = "grab" in commands
+        if metrics_config.get("report_file") and crawled:
+            metrics.write_report(metrics_config["report_file"], command=sys.argv[1:] if argv is None else argv)
+            logging.info(f"Rapport d'exécution écrit : {metrics_config['report_file']}")
+        if metrics_config.get("prometheus_file") and crawled:
+            metrics.write_prometheus(metrics_config["prometheus_file"])
+
     except Exception as e:
         logging.error(f"Erreur fatale: {e}")
         raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
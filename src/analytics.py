@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer les analyses avancées des annonces (percentiles, décote, annonces sous
+le prix du marché). Les annonces sont chargées une seule fois en colonnes NumPy, sans créer
+d'objet Cars par ligne, et tous les calculs sont vectorisés.
+"""
+
+import csv
+import json
+import numpy as np
+from src.cars_dao import CarsDAO
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+CAR_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("group", np.int32),
+    ("year", np.float64),
+    ("mileage", np.float64),
+    ("price", np.float64),
+])
+
+def load_car_arrays(cars_dao: CarsDAO) -> tuple[np.ndarray, list[tuple], np.ndarray, list[tuple]]:
+    """
+    Charge les annonces actives sous forme de tableau structuré NumPy. Les groupes
+    (marque, modèle, année, boîte) sont numérotés à partir de la table car_statistics :
+    une recherche par clé primaire dans une petite table temporaire par annonce est bien
+    moins coûteuse qu'un tri de toute la table (DENSE_RANK).
+
+    Args:
+        cars_dao (CarsDAO): DAO de la base des annonces
+
+    Returns:
+        tuple: tableau des annonces (CAR_DTYPE), libellés des groupes, numéro de modèle de
+        chaque groupe, libellés des modèles (marque, modèle)
+    """
+    with cars_dao.read_cursor() as cursor:
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS analytics_groups (
+                brand TEXT,
+                model TEXT,
+                year INTEGER,
+                gearbox TEXT,
+                code INTEGER,
+                PRIMARY KEY (brand, model, year, gearbox)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("DELETE FROM analytics_groups")
+        cursor.execute("""
+            INSERT INTO analytics_groups
+            SELECT brand, model, year, gearbox, ROW_NUMBER() OVER (ORDER BY brand, model, year, gearbox) - 1
+            FROM car_statistics
+            WHERE ad_count > 0
+        """)
+        cursor.execute("SELECT brand, model, year, gearbox FROM analytics_groups ORDER BY code")
+        groups = cursor.fetchall()
+        # car_statistics counts every active ad with a price, so each of them has a group code
+        cursor.execute("""
+            SELECT c.id,
+                   (SELECT g.code FROM analytics_groups g
+                    WHERE g.brand = c.brand AND g.model = c.model
+                      AND g.year = IFNULL(c.year, 0) AND g.gearbox = IFNULL(c.gearbox, '')),
+                   IFNULL(c.year, 0), IFNULL(c.mileage, 0), c.current_price
+            FROM cars c NOT INDEXED
+            WHERE c.removed_date IS NULL AND c.current_price > 0
+        """)
+        cars = np.fromiter(cursor, dtype=CAR_DTYPE)
+    models = list(dict.fromkeys((brand, model) for brand, model, _, _ in groups))
+    model_codes = {model: code for code, model in enumerate(models)}
+    group_models = np.array([model_codes[(brand, model)] for brand, model, _, _ in groups], dtype=np.int32)
+    return cars, groups, group_models, models
+
+def grouped_percentiles(groups: np.ndarray, values: np.ndarray, percentiles=PERCENTILES,
+                        minlength: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Percentiles de `values` au sein de chaque groupe (interpolation linéaire, comme np.percentile)
+
+    Args:
+        groups (np.ndarray): numéro de groupe de chaque valeur (0..G-1)
+        values (np.ndarray): valeurs
+        percentiles (tuple, optional): percentiles à calculer
+        minlength (int, optional): nombre minimal de groupes (G)
+
+    Returns:
+        tuple: effectif par groupe (G,), percentiles par groupe (G, len(percentiles))
+    """
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=minlength)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = np.full((len(counts), len(percentiles)), np.nan)
+    present = counts > 0
+    for column, percentile in enumerate(percentiles):
+        position = starts[present] + (counts[present] - 1) * percentile / 100
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        weight = position - lower
+        result[present, column] = sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+    return counts, result
+
+def depreciation_by_model(cars: np.ndarray, model: np.ndarray, model_count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Régression linéaire prix ~ année + kilométrage pour chaque modèle, résolue pour tous les
+    modèles à la fois à partir des équations normales (variables centrées par modèle)
+
+    Args:
+        cars (np.ndarray): annonces (CAR_DTYPE)
+        model (np.ndarray): numéro de modèle de chaque annonce
+        model_count (int): nombre de modèles
+
+    Returns:
+        tuple: coefficients (model_count, 3) prix moyen, variation de prix par année et par km,
+        année moyenne et kilométrage moyen de chaque modèle
+    """
+    counts = np.bincount(model, minlength=model_count).astype(np.float64)
+    safe_counts = np.maximum(counts, 1)
+    mean_year = np.bincount(model, cars["year"], model_count) / safe_counts
+    mean_mileage = np.bincount(model, cars["mileage"], model_count) / safe_counts
+    mean_price = np.bincount(model, cars["price"], model_count) / safe_counts
+    year = cars["year"] - mean_year[model]
+    mileage = cars["mileage"] - mean_mileage[model]
+    price = cars["price"] - mean_price[model]
+
+    def group_sum(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(model, weights, model_count)
+
+    xtx = np.empty((model_count, 2, 2))
+    xtx[:, 0, 0] = group_sum(year * year)
+    xtx[:, 0, 1] = xtx[:, 1, 0] = group_sum(year * mileage)
+    xtx[:, 1, 1] = group_sum(mileage * mileage)
+    xty = np.stack([group_sum(year * price), group_sum(mileage * price)], axis=1)
+    # The pseudo-inverse keeps degenerate models (single year, single ad...) finite
+    coefficients = np.einsum("gij,gj->gi", np.linalg.pinv(xtx), xty)
+    return np.column_stack([mean_price, coefficients]), mean_year, mean_mileage
+
+def analyse(cars_dao: CarsDAO, underpriced_threshold: float = 2.0) -> dict:
+    """
+    Calcule les percentiles de prix par groupe, la décote par modèle et repère les annonces
+    dont le prix est anormalement bas par rapport au prix prédit pour leur modèle, année et
+    kilométrage (résidu inférieur à -underpriced_threshold écarts robustes).
+
+    Args:
+        cars_dao (CarsDAO): DAO de la base des annonces
+        underpriced_threshold (float, optional): seuil en nombre d'écarts robustes (MAD)
+
+    Returns:
+        dict: "groups" (percentiles par groupe), "depreciation" (décote par modèle),
+        "underpriced" (annonces sous le prix prédit)
+    """
+    cars, groups, group_models, models = load_car_arrays(cars_dao)
+    if len(cars) == 0:
+        return {"groups": [], "depreciation": [], "underpriced": []}
+
+    counts, percentiles = grouped_percentiles(cars["group"], cars["price"], minlength=len(groups))
+    group_rows = [
+        {"brand": brand, "model": model, "year": year, "gearbox": gearbox, "ad_count": int(counts[index]),
+         **{f"p{percentile}": round(float(percentiles[index, column])) for column, percentile in enumerate(PERCENTILES)}}
+        for index, (brand, model, year, gearbox) in enumerate(groups) if counts[index]
+    ]
+
+    model = group_models[cars["group"]]
+    coefficients, mean_year, mean_mileage = depreciation_by_model(cars, model, len(models))
+    model_counts = np.bincount(model, minlength=len(models))
+    depreciation_rows = [
+        {"brand": brand, "model": model_name, "ad_count": int(model_counts[index]),
+         "average_price": round(float(coefficients[index, 0])),
+         "price_change_per_year": round(float(coefficients[index, 1])),
+         "price_change_per_10000_km": round(float(coefficients[index, 2] * 10000))}
+        for index, (brand, model_name) in enumerate(models) if model_counts[index]
+    ]
+
+    predicted = (coefficients[model, 0]
+                 + coefficients[model, 1] * (cars["year"] - mean_year[model])
+                 + coefficients[model, 2] * (cars["mileage"] - mean_mileage[model]))
+    residuals = cars["price"] - predicted
+    _, residual_median = grouped_percentiles(model, residuals, (50,), minlength=len(models))
+    _, mad = grouped_percentiles(model, np.abs(residuals - residual_median[model, 0]), (50,), minlength=len(models))
+    robust_scale = 1.4826 * mad[model, 0]
+    underpriced = (robust_scale > 0) & (residuals < -underpriced_threshold * robust_scale)
+
+    underpriced_rows = []
+    flagged = {int(car_id): (float(expected), float(score)) for car_id, expected, score in zip(
+        cars["id"][underpriced], predicted[underpriced], (residuals / np.where(robust_scale > 0, robust_scale, 1))[underpriced])}
+    if flagged:
+        with cars_dao.read_cursor() as cursor:
+            # json_each avoids the host parameter limit when many ads are flagged
+            cursor.execute("""
+                SELECT id, link, title, year, mileage, current_price
+                FROM cars
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(list(flagged)),))
+            for car_id, link, title, year, mileage, price in cursor.fetchall():
+                expected, score = flagged[car_id]
+                underpriced_rows.append({"link": link, "title": title, "year": year, "mileage": mileage, "current_price": price,
+                                         "predicted_price": round(expected), "robust_zscore": round(score, 2)})
+        underpriced_rows.sort(key=lambda row: row["robust_zscore"])
+    return {"groups": group_rows, "depreciation": depreciation_rows, "underpriced": underpriced_rows}
+
+def export_analytics_to_csv(rows: list[dict], output_file: str):
+    """
+    Exporte le résultat d'une analyse dans un fichier CSV
+
+    Args:
+        rows (list[dict]): lignes de l'analyse
+        output_file (str): chemin du fichier CSV
+    """
+    with open(output_file, mode='w', newline='', encoding='utf-8') as csvfile:
+        if not rows:
+            return
+        writer = csv.DictWriter(csvfile, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer la récupération concurrente des prix d'origine et dates de première
+publication sur les pages des annonces
+"""
+
+import asyncio
+import itertools
+import logging
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from src.cars_dao import CarRow, CarsDAO
+from src.metrics import metrics
+from src.scrapping import Scraper, article_content_scrapper
+
+def scrape_article(scraper: Scraper, link: str) -> dict | None:
+    """
+    Télécharge et analyse la page d'une annonce
+
+    Args:
+        scraper (Scraper): client HTTP
+        link (str): lien relatif de l'annonce
+
+    Returns:
+        dict: prix d'origine et date de première publication, None si la page est inaccessible
+    """
+    content = scraper.fetch(scraper.absolute_url(link))
+    if content is None:
+        return None
+    return article_content_scrapper(content, ["old_price", "first_publication_date"])
+
+async def backfill_original_prices(scraper: Scraper, cars_dao: CarsDAO, cars: Iterable[CarRow],
+                                   concurrency: int = 4, batch_size: int = 50) -> tuple[int, int]:
+    """
+    Récupère les pages de plusieurs annonces en parallèle (au plus `concurrency` requêtes en
+    cours, le débit global restant borné par le limiteur du Scraper) et enregistre les
+    résultats en base par lots de `batch_size`. Les annonces sont consommées au fur et à
+    mesure : seules celles en cours de traitement sont gardées en mémoire.
+
+    Args:
+        scraper (Scraper): client HTTP partagé
+        cars_dao (CarsDAO): DAO dans lequel enregistrer les résultats
+        cars (Iterable[CarRow]): annonces dont le prix d'origine est manquant (link, current_price)
+        concurrency (int, optional): nombre maximal de requêtes simultanées
+        batch_size (int, optional): nombre de mises à jour par transaction
+
+    Returns:
+        tuple[int, int]: nombre d'annonces mises à jour, nombre de pages inaccessibles
+    """
+    loop = asyncio.get_running_loop()
+    updated = 0
+    failed = 0
+    batch = []
+
+    async def fetch(car: CarRow) -> tuple[CarRow, dict | None]:
+        return car, await loop.run_in_executor(executor, scrape_article, scraper, car.link)
+
+    cars = iter(cars)
+    pending = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            # Twice as many tasks as workers keeps the executor busy without reading ahead
+            for car in itertools.islice(cars, 2 * concurrency - len(pending)):
+                pending.add(asyncio.ensure_future(fetch(car)))
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                car, article_dict = task.result()
+                if article_dict is None:
+                    logging.error(f"Impossible de récupérer la page de l'annonce : {car.link}")
+                    metrics.increment("backfill_pages_total", result="failed")
+                    failed += 1
+                    continue
+                metrics.increment("backfill_pages_total", result="ok")
+                original_price = article_dict.get("old_price") or car.current_price
+                first_publication_date = article_dict.get("first_publication_date")
+                batch.append((car.link, original_price, first_publication_date))
+                logging.info(f"Prix original trouvé pour l'annonce : {car.link} - Prix original : {original_price}€ - Date de première publication : {first_publication_date}")
+                if len(batch) >= batch_size:
+                    cars_dao.update_cars_original_price(batch)
+                    updated += len(batch)
+                    batch = []
+    if batch:
+        cars_dao.update_cars_original_price(batch)
+        updated += len(batch)
+    return updated, failed
+
+def run_backfill(scraper: Scraper, cars_dao: CarsDAO, cars: Iterable[CarRow],
+                 concurrency: int = 4, batch_size: int = 50) -> tuple[int, int]:
+    """
+    Point d'entrée synchrone de backfill_original_prices
+    """
+    return asyncio.run(backfill_original_prices(scraper, cars_dao, cars, concurrency, batch_size))
@@ -3,9 +3,31 @@
 Module pour gérer la classe Car, ses attributs, méthodes associées et DAO
 """
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime
 
-@dataclass
+def parse_datetime(value) -> datetime | None:
+    """
+    Convertit une date (date, datetime, ou texte "YYYY-MM-DD" / "YYYY-MM-DD HH:MM:SS") en datetime
+
+    Args:
+        value: date à convertir
+
+    Returns:
+        datetime | None: date convertie, None si la valeur est vide
+
+    Raises:
+        ValueError: si le texte n'est pas une date ISO
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value) if value else None
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    raise ValueError(f"Date invalide : {value!r}")
+
+# Slots: no per-instance __dict__, which matters when hundreds of thousands of ads are held in memory
+@dataclass(slots=True)
 class Cars:
     brand: str
     model: str
@@ -40,21 +62,27 @@ class Cars:
         }
     @classmethod
     def from_dict(cls, data: dict) -> 'Cars':
-        return cls(
-            brand=data.get("brand", ""),
-            model=data.get("model", ""),
-            link=data.get("link", ""),
-            title=data.get("title", ""),
-            year=data.get("year", 0),
-            original_price=data.get("original_price", 0.0),
-            current_price=data.get("current_price", 0.0),
-            mileage=data.get("mileage", 0),
-            gearbox=data.get("gearbox", ""),
-            first_publication_date=data.get("first_publication_date", None),
-            update_date=data.get("update_date", None),
-            duration_on_site=data.get("duration_on_site", 0),
-            price_variation=data.get("price_variation", 0.0)
-        )
+        # Positional arguments and a bound get: keyword arguments cost more than the lookups
+        get = data.get
+        first_publication_date = get("first_publication_date")
+        update_date = get("update_date")
+        # Parsed pages already give datetime objects; only text dates need converting
+        if first_publication_date is not None and first_publication_date.__class__ is not datetime:
+            first_publication_date = parse_datetime(first_publication_date)
+        if update_date is not None and update_date.__class__ is not datetime:
+            update_date = parse_datetime(update_date)
+        return cls(get("brand", ""), get("model", ""), get("link", ""), get("title", ""), get("year", 0),
+                   get("original_price", 0.0), get("current_price", 0.0), get("mileage", 0), get("gearbox", ""),
+                   first_publication_date, update_date, get("duration_on_site", 0), get("price_variation", 0.0))
+    @classmethod
+    def from_row(cls, row) -> 'Cars':
+        """
+        Construit une annonce à partir d'une ligne de la table cars (CarRow), dont les dates
+        sont déjà converties par sqlite3 (voir src.cars_dao)
+        """
+        return cls(row.brand, row.model, row.link, row.title, row.year, row.original_price, row.current_price, row.mileage,
+                   row.gearbox, row.first_publication_date, row.update_date, row.duration_on_site or 0, row.price_variation or 0.0)
+
 # Example usage:
 # car_data = {
 #     "brand": "Peugeot",
@@ -4,16 +4,195 @@ Module pour gérer la persistance de la classe Cars dans une base de données sq
 """
 import sqlite3
 import csv
+import logging
+import math
+import re
+import threading
+from collections import namedtuple
+from collections.abc import Iterator
+from contextlib import contextmanager
 from src.cars import Cars
-from datetime import date
+from src.metrics import metrics
+from datetime import date, datetime
+
+CAR_COLUMNS = (
+    "id", "brand", "model", "link", "title", "year", "original_price", "current_price", "mileage", "gearbox",
+    "first_publication_date", "update_date", "duration_on_site", "price_variation", "removed_date",
+)
+
+# Ligne de la table cars, bien plus légère qu'un objet Cars pour les parcours de toute la table
+CarRow = namedtuple("CarRow", CAR_COLUMNS)
+
+# Changement du journal car_changes (voir read_changes), avec l'annonce concernée
+CHANGE_COLUMNS = ("seq", "kind", "ad_id", "old_price", "new_price", "changed_at", "link", "brand", "model", "title",
+                  "year", "mileage")
+CarChange = namedtuple("CarChange", CHANGE_COLUMNS)
+
+# Types de changements : nouvelle annonce, changement de prix, annonce retirée du site,
+# annonce retirée revue en ligne
+CHANGE_KINDS = ("new", "price", "removed", "relisted")
+
+# Préfixe des clés de la table metadata où sont conservés les curseurs des consommateurs
+CHANGE_CURSOR_KEY = "changes_cursor:"
+
+def _convert_timestamp(value: bytes) -> datetime | str:
+    # "YYYY-MM-DD" and "YYYY-MM-DD HH:MM:SS" are both stored; anything else is left as text
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+# Dates are written as ISO text and read back as datetime/date objects (PARSE_DECLTYPES), replacing
+# the default sqlite3 adapters deprecated since Python 3.12
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", _convert_timestamp)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+# Annonces encore en ligne dont le prix d'origine n'a pas été trouvé (voir l'index partiel associé)
+MISSING_ORIGINAL_PRICE = "(original_price IS NULL OR original_price = 0) AND removed_date IS NULL"
+
+# Tris possibles des recherches (search_cars) et colonne correspondante
+SEARCH_ORDERS = {"price": "current_price", "year": "year", "mileage": "mileage"}
+
+# Colonnes des index de chaque tri : les filtres numériques sur les colonnes suivant celle du
+# tri sont vérifiés dans l'index, sans lire les lignes. L'année, qui a peu de valeurs
+# distinctes, doit être directement suivie de l'id pour que le tri (year, id) soit celui de
+# l'index.
+SEARCH_INDEXES = {"price": "current_price, year, mileage", "year": "year", "mileage": "mileage, year, current_price"}
+
+# Au-delà de ce nombre d'annonces, un mot est filtré par LIKE pendant le parcours de l'index
+# du tri plutôt que par l'index plein texte (voir search_cars) ; de même pour les mots plus
+# courts que FTS_MIN_WORD, dont le préfixe correspond à trop de mots de l'index
+FTS_COMMON_WORD = 1000
+FTS_MIN_WORD = 3
+
+def fts_query(text: str) -> str | None:
+    """
+    Convertit un texte libre en requête FTS5 : chaque mot, entre guillemets (les opérateurs
+    FTS5 ne sont pas interprétés), doit préfixer un mot du titre
+
+    Args:
+        text (str): texte recherché (ex : "GTS targa")
+
+    Returns:
+        str | None: requête FTS5, None si le texte ne contient aucun mot
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words) if words else None
 
 class CarsDAO:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, cache_size_mb: int = 20):
+        """
+        Args:
+            db_path (str): chemin de la base sqlite
+            cache_size_mb (int, optional): taille maximale du cache de pages de sqlite, en
+                Mo (mémoire qui augmente avec la base jusqu'à cette limite)
+        """
         self.db_path = db_path
+        self.cache_size_mb = cache_size_mb
+        # Connexion unique conservée pendant toute la durée de vie du DAO, partagée entre
+        # threads et protégée par un verrou réentrant
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+        self._conn = self._connect()
+        self._fts = True
         self._create_table()
 
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Ouvre la connexion sqlite en mode autocommit (les transactions sont gérées par
+        transaction()) et applique les pragmas de performance.
+
+        Returns:
+            sqlite3.Connection: connexion ouverte
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False, cached_statements=256,
+                               detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_mb * 1000}")  # in KiB
+        conn.execute("PRAGMA mmap_size = 268435456")  # 256 Mo
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Regroupe toutes les écritures effectuées dans le bloc en une seule transaction
+        (un seul commit). Les appels imbriqués rejoignent la transaction englobante.
+
+        Yields:
+            sqlite3.Connection: connexion à utiliser dans le bloc
+        """
+        with self._lock:
+            if self._transaction_depth == 0:
+                self._conn.execute("BEGIN")
+            self._transaction_depth += 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._conn.execute("COMMIT")
+
+    @contextmanager
+    def read_cursor(self):
+        """
+        Curseur de lecture sur la connexion du DAO, pour les requêtes d'analyse et d'export
+
+        Yields:
+            sqlite3.Cursor: curseur, fermé à la sortie du bloc
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def get_metadata(self, key: str) -> str | None:
+        """
+        Lit une valeur de la table metadata
+
+        Args:
+            key (str): clé
+
+        Returns:
+            str | None: valeur, ou None si la clé est absente
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_metadata(self, key: str, value: str):
+        """
+        Enregistre une valeur dans la table metadata
+
+        Args:
+            key (str): clé
+            value (str): valeur
+        """
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> 'CarsDAO':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def _create_table(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS cars (
@@ -30,98 +209,881 @@ class CarsDAO:
                     first_publication_date TIMESTAMP DEFAULT NULL,
                     update_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     duration_on_site INTEGER DEFAULT NULL,
-                    price_variation REAL DEFAULT NULL
+                    price_variation REAL DEFAULT NULL,
+                    removed_date TIMESTAMP DEFAULT NULL,
+                    modified_date TIMESTAMP DEFAULT NULL
+                )
+            """)
+            # Columns added after the initial schema
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(cars)")}
+            if "removed_date" not in columns:
+                cursor.execute("ALTER TABLE cars ADD COLUMN removed_date TIMESTAMP DEFAULT NULL")
+            # Last change of the computed columns (duration, price variation), which leaves update_date as is
+            if "modified_date" not in columns:
+                cursor.execute("ALTER TABLE cars ADD COLUMN modified_date TIMESTAMP DEFAULT NULL")
+            # Crawl progress of each search, used to resume an interrupted run
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_jobs (
+                    search_key TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    last_page_url TEXT DEFAULT NULL,
+                    started_at TIMESTAMP DEFAULT NULL,
+                    finished_at TIMESTAMP DEFAULT NULL,
+                    pages INTEGER DEFAULT 0,
+                    inserted INTEGER DEFAULT 0,
+                    updated INTEGER DEFAULT 0,
+                    removed INTEGER DEFAULT 0
+                )
+            """)
+            # Backfill scan (iter_cars_missing_original_price): only the matching ads are indexed
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_cars_missing_original_price ON cars (id) WHERE {MISSING_ORIGINAL_PRICE}")
+        self._migrate_unique_link()
+        self._create_price_history()
+        self._create_statistics()
+        self._create_search()
+        self._create_changes()
+
+    def _create_price_history(self):
+        """
+        Crée l'historique des prix : cars, dont chaque annonce est identifiée de façon unique
+        par son lien, sert de table des annonces et price_observations conserve un relevé
+        (ad_id, observed_on, price) à chaque changement de prix. Les relevés sont écrits par
+        des triggers, dans la même transaction que l'écriture de l'annonce ; un prix inchangé
+        ne coûte donc rien. À la création, l'historique est initialisé depuis les annonces
+        existantes (prix d'origine à la date de première publication, prix courant à la date
+        de mise à jour).
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_observations'")
+            migrate = cursor.fetchone() is None
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS price_observations (
+                    ad_id INTEGER NOT NULL REFERENCES cars (id) ON DELETE CASCADE,
+                    observed_on DATE NOT NULL,
+                    price REAL NOT NULL,
+                    PRIMARY KEY (ad_id, observed_on)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_cars_price_insert
+                AFTER INSERT ON cars
+                WHEN NEW.current_price IS NOT NULL
+                BEGIN
+                    INSERT INTO price_observations (ad_id, observed_on, price)
+                    VALUES (NEW.id, COALESCE(date(NEW.update_date), date('now')), NEW.current_price)
+                    ON CONFLICT (ad_id, observed_on) DO UPDATE SET price = excluded.price;
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_cars_price_update
+                AFTER UPDATE OF current_price ON cars
+                WHEN NEW.current_price IS NOT NULL AND NEW.current_price IS NOT OLD.current_price
+                BEGIN
+                    INSERT INTO price_observations (ad_id, observed_on, price)
+                    VALUES (NEW.id, COALESCE(date(NEW.update_date), date('now')), NEW.current_price)
+                    ON CONFLICT (ad_id, observed_on) DO UPDATE SET price = excluded.price;
+                END
+            """)
+            if migrate:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO price_observations (ad_id, observed_on, price)
+                    SELECT id, date(first_publication_date), original_price
+                    FROM cars
+                    WHERE first_publication_date IS NOT NULL AND original_price > 0
+                """)
+                cursor.execute("""
+                    INSERT OR REPLACE INTO price_observations (ad_id, observed_on, price)
+                    SELECT id, date(update_date), current_price
+                    FROM cars
+                    WHERE update_date IS NOT NULL AND current_price IS NOT NULL
+                """)
+
+    def _create_statistics(self):
+        """
+        Crée les agrégats de statistiques par groupe (marque, modèle, année, boîte) sur les
+        annonces actives (non retirées) : nombre d'annonces, somme, somme des carrés, minimum
+        et maximum des prix, somme des kilométrages. Ils sont tenus à jour par des triggers à
+        chaque écriture d'annonce, dans la même transaction, de sorte que le calcul des
+        statistiques ne relit plus la table cars. Le minimum et le maximum d'un groupe ne sont
+        recalculés (via un index partiel) que lorsque l'annonce qui le portait en sort.
+        À la création, les annonces absentes du dernier relevé de leur recherche (mises à
+        jour avant lui), que les statistiques ignoraient jusqu'ici, sont marquées comme
+        retirées à la date de ce relevé. Une table metadata conserve le dernier passage du
+        calcul des durées et variations.
+        """
+        def counted(row: str) -> str:
+            return f"{row}.removed_date IS NULL AND {row}.current_price IS NOT NULL"
+
+        def add(row: str) -> str:
+            # "WHERE" is required by sqlite to parse an upsert whose source is a SELECT
+            return f"""
+                INSERT INTO car_statistics (brand, model, year, gearbox, ad_count, sum_price, sum_price_sq, min_price, max_price, mileage_count, sum_mileage)
+                SELECT {row}.brand, {row}.model, IFNULL({row}.year, 0), IFNULL({row}.gearbox, ''), 1, {row}.current_price, {row}.current_price * {row}.current_price,
+                       {row}.current_price, {row}.current_price, {row}.mileage IS NOT NULL, IFNULL({row}.mileage, 0)
+                WHERE {counted(row)}
+                ON CONFLICT (brand, model, year, gearbox) DO UPDATE SET
+                    ad_count = ad_count + 1,
+                    sum_price = sum_price + excluded.sum_price,
+                    sum_price_sq = sum_price_sq + excluded.sum_price_sq,
+                    min_price = MIN(IFNULL(min_price, excluded.min_price), excluded.min_price),
+                    max_price = MAX(IFNULL(max_price, excluded.max_price), excluded.max_price),
+                    mileage_count = mileage_count + excluded.mileage_count,
+                    sum_mileage = sum_mileage + excluded.sum_mileage;"""
+
+        def subtract(row: str) -> str:
+            group = f"brand = {row}.brand AND model = {row}.model AND year = IFNULL({row}.year, 0) AND gearbox = IFNULL({row}.gearbox, '')"
+            active_group = f"brand = {row}.brand AND model = {row}.model AND IFNULL(year, 0) = IFNULL({row}.year, 0) AND IFNULL(gearbox, '') = IFNULL({row}.gearbox, '') AND removed_date IS NULL AND current_price IS NOT NULL"
+            return f"""
+                UPDATE car_statistics SET
+                    ad_count = ad_count - 1,
+                    sum_price = sum_price - {row}.current_price,
+                    sum_price_sq = sum_price_sq - {row}.current_price * {row}.current_price,
+                    min_price = CASE WHEN {row}.current_price <= min_price THEN (SELECT MIN(current_price) FROM cars WHERE {active_group}) ELSE min_price END,
+                    max_price = CASE WHEN {row}.current_price >= max_price THEN (SELECT MAX(current_price) FROM cars WHERE {active_group}) ELSE max_price END,
+                    mileage_count = mileage_count - ({row}.mileage IS NOT NULL),
+                    sum_mileage = sum_mileage - IFNULL({row}.mileage, 0)
+                WHERE {counted(row)} AND {group};"""
+
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+            # Superseded by car_statistics
+            cursor.execute("DROP VIEW IF EXISTS latest_cars")
+            cursor.execute("DROP INDEX IF EXISTS idx_cars_snapshot")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_cars_update_date ON cars (update_date)")
+            # Incremental exports also pick up the ads removed or recomputed since the previous export
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_cars_removed_date ON cars (removed_date) WHERE removed_date IS NOT NULL")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_cars_modified_date ON cars (modified_date) WHERE modified_date IS NOT NULL")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_cars_active_group
+                ON cars (brand, model, IFNULL(year, 0), IFNULL(gearbox, ''), current_price)
+                WHERE removed_date IS NULL AND current_price IS NOT NULL
+            """)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'car_statistics'")
+            migrate = cursor.fetchone() is None
+            if migrate:
+                # Statistics used to be computed on the latest snapshot of each search: the ads
+                # missing from it had left the site, on the date of that snapshot
+                cursor.execute("""
+                    UPDATE cars SET removed_date = latest.snapshot_date
+                    FROM (SELECT brand, model, MAX(date(update_date)) AS snapshot_date FROM cars GROUP BY brand, model) AS latest
+                    WHERE cars.brand = latest.brand AND cars.model = latest.model
+                      AND cars.removed_date IS NULL AND date(cars.update_date) < latest.snapshot_date
+                """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS car_statistics (
+                    brand TEXT,
+                    model TEXT,
+                    year INTEGER,
+                    gearbox TEXT,
+                    ad_count INTEGER NOT NULL,
+                    sum_price REAL NOT NULL,
+                    sum_price_sq REAL NOT NULL,
+                    min_price REAL,
+                    max_price REAL,
+                    mileage_count INTEGER NOT NULL,
+                    sum_mileage REAL NOT NULL,
+                    PRIMARY KEY (brand, model, year, gearbox)
+                )
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_cars_statistics_insert
+                AFTER INSERT ON cars
+                BEGIN {add("NEW")}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_cars_statistics_delete
+                AFTER DELETE ON cars
+                BEGIN {subtract("OLD")}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_cars_statistics_update
+                AFTER UPDATE OF brand, model, year, gearbox, current_price, mileage, removed_date ON cars
+                WHEN OLD.brand IS NOT NEW.brand OR OLD.model IS NOT NEW.model OR OLD.year IS NOT NEW.year
+                  OR OLD.gearbox IS NOT NEW.gearbox OR OLD.current_price IS NOT NEW.current_price
+                  OR OLD.mileage IS NOT NEW.mileage OR OLD.removed_date IS NOT NEW.removed_date
+                BEGIN
+                    {subtract("OLD")}
+                    {add("NEW")}
+                END
+            """)
+            if migrate:
+                cursor.execute("""
+                    INSERT INTO car_statistics (brand, model, year, gearbox, ad_count, sum_price, sum_price_sq, min_price, max_price, mileage_count, sum_mileage)
+                    SELECT brand, model, IFNULL(year, 0), IFNULL(gearbox, ''), COUNT(*), SUM(current_price), SUM(current_price * current_price),
+                           MIN(current_price), MAX(current_price), COUNT(mileage), IFNULL(SUM(mileage), 0)
+                    FROM cars
+                    WHERE removed_date IS NULL AND current_price IS NOT NULL
+                    GROUP BY brand, model, IFNULL(year, 0), IFNULL(gearbox, '')
+                """)
+
+    def _create_search(self):
+        """
+        Crée les structures de search_cars : un index plein texte FTS5 des titres (table à
+        contenu externe, tenue à jour par des triggers et remplie à sa création) et des index
+        composites sur les annonces actives, pour filtrer par marque et modèle et parcourir
+        les résultats dans l'ordre du tri. Sans FTS5 dans la version de sqlite, la recherche
+        de texte se rabat sur LIKE.
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            # One index per sort, with and without the brand and model prefix
+            for order, columns in SEARCH_INDEXES.items():
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_cars_search_{order} ON cars (brand, model, {columns}) WHERE removed_date IS NULL")
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_cars_active_{order} ON cars ({columns}) WHERE removed_date IS NULL")
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cars_fts'")
+            if cursor.fetchone():
+                return
+            try:
+                cursor.execute("""
+                    CREATE VIRTUAL TABLE cars_fts USING fts5(
+                        title, content = 'cars', content_rowid = 'id', tokenize = 'unicode61 remove_diacritics 2'
+                    )
+                """)
+            except sqlite3.OperationalError as e:
+                logging.warning(f"Index plein texte indisponible ({e}), recherche de texte par LIKE")
+                self._fts = False
+                return
+            cursor.execute("""
+                CREATE TRIGGER trg_cars_fts_insert AFTER INSERT ON cars
+                BEGIN
+                    INSERT INTO cars_fts (rowid, title) VALUES (NEW.id, NEW.title);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER trg_cars_fts_delete AFTER DELETE ON cars
+                BEGIN
+                    INSERT INTO cars_fts (cars_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER trg_cars_fts_update AFTER UPDATE OF title ON cars
+                BEGIN
+                    INSERT INTO cars_fts (cars_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+                    INSERT INTO cars_fts (rowid, title) VALUES (NEW.id, NEW.title);
+                END
+            """)
+            cursor.execute("INSERT INTO cars_fts (cars_fts) VALUES ('rebuild')")
+
+    def _create_changes(self):
+        """
+        Crée le journal des changements car_changes, en ajout seul : nouvelles annonces,
+        changements de prix (ancien et nouveau prix), annonces retirées et remises en ligne.
+        Chaque changement est écrit par un trigger dans la même transaction que l'annonce et
+        reçoit un numéro de séquence croissant (AUTOINCREMENT : jamais réutilisé, même après
+        une purge). Les consommateurs lisent le journal à partir de leur curseur (voir
+        read_changes) au lieu de comparer des copies complètes de la table. Le journal
+        commence à sa création : les annonces déjà présentes n'y figurent pas.
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS car_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    ad_id INTEGER NOT NULL,
+                    old_price REAL DEFAULT NULL,
+                    new_price REAL DEFAULT NULL,
+                    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            conn.commit()
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_cars_changes_insert
+                AFTER INSERT ON cars
+                BEGIN
+                    INSERT INTO car_changes (kind, ad_id, new_price) VALUES ('new', NEW.id, NEW.current_price);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_cars_changes_price
+                AFTER UPDATE OF current_price ON cars
+                WHEN NEW.current_price IS NOT OLD.current_price
+                BEGIN
+                    INSERT INTO car_changes (kind, ad_id, old_price, new_price)
+                    VALUES ('price', NEW.id, OLD.current_price, NEW.current_price);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_cars_changes_removed
+                AFTER UPDATE OF removed_date ON cars
+                WHEN (OLD.removed_date IS NULL) <> (NEW.removed_date IS NULL)
+                BEGIN
+                    INSERT INTO car_changes (kind, ad_id, new_price)
+                    VALUES (CASE WHEN NEW.removed_date IS NULL THEN 'relisted' ELSE 'removed' END, NEW.id, NEW.current_price);
+                END
+            """)
+
+    def _migrate_unique_link(self):
+        """
+        Crée l'index UNIQUE sur cars.link utilisé par upsert_cars. Les bases existantes
+        pouvant contenir des doublons, ceux-ci sont fusionnés au préalable : la ligne la plus
+        récente (id max) est conservée et récupère la première date de publication et le
+        premier prix d'origine connus parmi ses doublons.
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_cars_link'")
+            if cursor.fetchone():
+                return
+            cursor.execute("""
+                UPDATE cars
+                SET first_publication_date = (
+                        SELECT MIN(dup.first_publication_date) FROM cars dup WHERE dup.link = cars.link
+                    ),
+                    original_price = COALESCE(
+                        (SELECT dup.original_price FROM cars dup
+                         WHERE dup.link = cars.link AND dup.original_price > 0
+                         ORDER BY dup.id LIMIT 1),
+                        original_price
+                    )
+                WHERE id IN (SELECT MAX(id) FROM cars GROUP BY link HAVING COUNT(*) > 1)
+            """)
+            cursor.execute("""
+                DELETE FROM cars
+                WHERE link IS NOT NULL
+                  AND id NOT IN (SELECT MAX(id) FROM cars WHERE link IS NOT NULL GROUP BY link)
+            """)
+            cursor.execute("CREATE UNIQUE INDEX idx_cars_link ON cars (link)")
 
     def insert_car(self, car: Cars):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO cars (brand, model, link, title, year, original_price, current_price, mileage, gearbox, first_publication_date, update_date, duration_on_site, price_variation)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (car.brand, car.model, car.link, car.title, car.year, car.original_price, car.current_price, car.mileage, car.gearbox, car.first_publication_date, date.today(), car.duration_on_site, car.price_variation))
-            conn.commit()
     
-    def get_all_cars(self) -> list[Cars]:
-        with sqlite3.connect(self.db_path) as conn:
+    def upsert_cars(self, cars: list[Cars], observed_on: date | None = None) -> tuple[int, int, int]:
+        """
+        Insère ou met à jour un lot d'annonces (typiquement une page de résultats) dans une
+        seule transaction. Une annonce déjà connue (même lien) voit seulement son prix courant
+        et sa date de mise à jour modifiés, et n'est plus considérée comme retirée ; son prix
+        d'origine et sa date de première publication ne sont renseignés que s'ils manquaient
+        encore.
+
+        Pour des annonces relevées avant aujourd'hui (pages relues dans le cache HTTP),
+        `observed_on` sert de date de mise à jour et les annonces déjà mises à jour ou
+        retirées à cette date ou après ne sont pas modifiées : une page ancienne ne remplace
+        pas un prix plus récent et n'écrit ni relevé de prix ni changement erroné.
+
+        Args:
+            cars (list[Cars]): annonces à enregistrer
+            observed_on (date, optional): date à laquelle les annonces ont été relevées
+                (par défaut, aujourd'hui)
+
+        Returns:
+            tuple[int, int, int]: nombre d'annonces (liens distincts) insérées, d'annonces
+            connues dont le prix a changé et d'annonces connues au prix inchangé (ou plus
+            récentes que le relevé)
+        """
+        if not cars:
+            return 0, 0, 0
+        # An ad listed twice in the batch (e.g. moved to the next page during the crawl) is
+        # counted and written once, with its last values
+        cars = list({car.link: car for car in cars}.values())
+        update_date = observed_on or date.today()
+        links = [car.link for car in cars]
+        query = """
+            INSERT INTO cars (brand, model, link, title, year, original_price, current_price, mileage, gearbox, first_publication_date, update_date, duration_on_site, price_variation)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(link) DO UPDATE SET
+                current_price = excluded.current_price,
+                update_date = excluded.update_date,
+                original_price = COALESCE(NULLIF(cars.original_price, 0), excluded.original_price),
+                first_publication_date = COALESCE(cars.first_publication_date, excluded.first_publication_date),
+                removed_date = NULL
+        """
+        if observed_on is not None:
+            query += """
+                WHERE cars.update_date < excluded.update_date
+                  AND (cars.removed_date IS NULL OR cars.removed_date < excluded.update_date)
+            """
+        with metrics.timer("db_write_seconds", operation="upsert"), self.transaction() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT brand, model, link, title, year, original_price, current_price, mileage, gearbox, first_publication_date, update_date FROM cars")
-            rows = cursor.fetchall()
-            cars = [Cars(brand=row[0], model=row[1], link=row[2], title=row[3], year=row[4], original_price=row[5], current_price=row[6], mileage=row[7], gearbox=row[8], first_publication_date=row[9], update_date=row[10]) for row in rows]
-            return cars
+            placeholders = ", ".join("?" * len(links))
+            cursor.execute(f"""
+                SELECT link, current_price, ? IS NOT NULL AND (update_date >= ? OR removed_date >= ?)
+                FROM cars WHERE link IN ({placeholders})
+            """, [observed_on, update_date, update_date, *links])
+            known = {link: (price, bool(newer)) for link, price, newer in cursor.fetchall()}
+            cursor.executemany(query, [(car.brand, car.model, car.link, car.title, car.year, car.original_price, car.current_price, car.mileage, car.gearbox, car.first_publication_date, update_date, car.duration_on_site, car.price_variation) for car in cars])
+        inserted = len(set(links) - known.keys())
+        unchanged = sum(1 for car in cars if car.link in known and (known[car.link][1] or known[car.link][0] == car.current_price))
+        metrics.increment("cars_total", inserted, result="inserted")
+        metrics.increment("cars_total", len(cars) - inserted - unchanged, result="updated")
+        metrics.increment("cars_total", unchanged, result="unchanged")
+        return inserted, len(cars) - inserted - unchanged, unchanged
+
+    def mark_removed(self, brand: str, model: str, seen_links: set[str], published_since=None) -> int:
+        """
+        Marque comme retirées du site les annonces encore actives d'une recherche qui n'ont
+        pas été vues lors du dernier crawl.
+
+        Args:
+            brand (str): marque de la recherche
+            model (str): modèle de la recherche
+            seen_links (set[str]): liens des annonces vues pendant le crawl
+            published_since (datetime, optional): si le crawl s'est arrêté avant la dernière
+                page, limite le marquage aux annonces publiées après cette date (seules
+                celles-ci auraient forcément été vues)
+
+        Returns:
+            int: nombre d'annonces marquées comme retirées
+        """
+        with metrics.timer("db_write_seconds", operation="mark_removed"), self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS seen_links (link TEXT PRIMARY KEY)")
+            cursor.execute("DELETE FROM seen_links")
+            cursor.executemany("INSERT OR IGNORE INTO seen_links (link) VALUES (?)", [(link,) for link in seen_links])
+            query = """
+                UPDATE cars
+                SET removed_date = ?
+                WHERE brand = ? AND model = ? AND removed_date IS NULL
+                  AND link NOT IN (SELECT link FROM seen_links)
+            """
+            params = [date.today(), brand, model]
+            if published_since is not None:
+                query += " AND first_publication_date > ?"
+                params.append(published_since)
+            cursor.execute(query, params)
+            metrics.increment("cars_total", cursor.rowcount, result="removed")
+            return cursor.rowcount
+
+    def start_crawl_jobs(self, search_keys: list[str]) -> dict[str, str | None]:
+        """
+        Prépare le crawl d'une liste de recherches. Si le run précédent a été interrompu
+        (une recherche n'est pas terminée), il est repris : seules les recherches non
+        terminées sont renvoyées, avec la dernière page enregistrée. Sinon un nouveau run
+        démarre avec toutes les recherches.
+
+        Args:
+            search_keys (list[str]): identifiants des recherches ('brand|model')
+
+        Returns:
+            dict[str, str | None]: recherches à crawler et URL de reprise (None : depuis le début)
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            placeholders = ", ".join("?" * len(search_keys))
+            cursor.execute(f"SELECT search_key, status, last_page_url FROM crawl_jobs WHERE search_key IN ({placeholders})", search_keys)
+            jobs = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+            if all(status == "done" for status, _ in jobs.values()):
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO crawl_jobs (search_key, status, last_page_url, started_at)
+                    VALUES (?, 'pending', NULL, NULL)
+                """, [(key,) for key in search_keys])
+                return {key: None for key in search_keys}
+            cursor.executemany(
+                "INSERT OR IGNORE INTO crawl_jobs (search_key, status) VALUES (?, 'pending')",
+                [(key,) for key in search_keys if key not in jobs]
+            )
+            return {key: jobs.get(key, ("pending", None))[1] for key in search_keys if jobs.get(key, ("pending", None))[0] != "done"}
+
+    def update_crawl_job(self, search_key: str, status: str, last_page_url: str | None = None, stats: dict | None = None):
+        """
+        Enregistre l'avancement du crawl d'une recherche
+
+        Args:
+            search_key (str): identifiant de la recherche
+            status (str): 'running', 'done' ou 'failed'
+            last_page_url (str, optional): dernière page de résultats enregistrée
+            stats (dict, optional): statistiques renvoyées par crawl_search, en fin de crawl
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            if stats is not None:
+                cursor.execute("""
+                    UPDATE crawl_jobs
+                    SET status = ?, finished_at = CURRENT_TIMESTAMP, pages = ?, inserted = ?, updated = ?, removed = ?
+                    WHERE search_key = ?
+                """, (status, stats["pages"], stats["inserted"], stats["updated"], stats["removed"], search_key))
+            elif last_page_url is not None:
+                cursor.execute("UPDATE crawl_jobs SET status = ?, last_page_url = ? WHERE search_key = ?", (status, last_page_url, search_key))
+            else:
+                cursor.execute("""
+                    UPDATE crawl_jobs SET status = ?, started_at = COALESCE(started_at, CURRENT_TIMESTAMP) WHERE search_key = ?
+                """, (status, search_key))
+
+    def iter_cars(self, where: str | None = None, params: tuple = (), batch_size: int = 1000,
+                  as_cars: bool = False) -> Iterator[CarRow] | Iterator[Cars]:
+        """
+        Parcourt les annonces par blocs de `batch_size`, par pagination sur l'identifiant
+        (id > dernier id lu) : chaque bloc est une requête indépendante, le verrou du DAO est
+        relâché entre deux blocs et les annonces peuvent être modifiées pendant le parcours.
+
+        Args:
+            where (str, optional): condition SQL de filtrage (paramètres "?")
+            params (tuple, optional): paramètres de la condition
+            batch_size (int, optional): nombre d'annonces lues par requête
+            as_cars (bool, optional): renvoie des objets Cars plutôt que des CarRow
+
+        Yields:
+            CarRow | Cars: annonces, par identifiant croissant
+        """
+        query = f"SELECT {', '.join(CAR_COLUMNS)} FROM cars WHERE id > ?"
+        if where:
+            query += f" AND ({where})"
+        query += " ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(query, (last_id, *params, batch_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for row in rows:
+                car = CarRow._make(row)
+                yield Cars.from_row(car) if as_cars else car
+            if len(rows) < batch_size:
+                return
+
+    def iter_cars_missing_original_price(self, batch_size: int = 1000) -> Iterator[CarRow]:
+        """
+        Parcourt les annonces en ligne dont le prix d'origine est manquant (index partiel)
+        """
+        return self.iter_cars(MISSING_ORIGINAL_PRICE, batch_size=batch_size)
+
+    def count_cars(self, where: str | None = None, params: tuple = ()) -> int:
+        """
+        Nombre d'annonces vérifiant une condition SQL
+
+        Args:
+            where (str, optional): condition SQL de filtrage (paramètres "?")
+            params (tuple, optional): paramètres de la condition
+
+        Returns:
+            int: nombre d'annonces
+        """
+        query = "SELECT COUNT(*) FROM cars" + (f" WHERE {where}" if where else "")
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def search_cars(self, text: str | None = None, brand: str | None = None, model: str | None = None,
+                    year_min: int | None = None, year_max: int | None = None, price_min: float | None = None,
+                    price_max: float | None = None, mileage_min: int | None = None, mileage_max: int | None = None,
+                    gearbox: str | None = None, include_removed: bool = False, order_by: str = "price",
+                    descending: bool = False, after: tuple | None = None, limit: int = 50) -> tuple[list[CarRow], tuple | None]:
+        """
+        Recherche des annonces, une page à la fois. La pagination se fait par clé (valeur du
+        tri et identifiant de la dernière annonce de la page précédente) : chaque page est
+        lue directement dans l'index du tri, quelle que soit sa position. Les annonces sans
+        valeur pour la colonne du tri sont ignorées.
+
+        Les mots peu fréquents sont cherchés dans l'index plein texte ; un mot présent dans
+        plus de FTS_COMMON_WORD annonces (ou trop court) est filtré par LIKE pendant le parcours
+        de l'index du tri, où les annonces qui le contiennent sont vite trouvées, plutôt que de
+        lire toutes ses occurrences dans l'index plein texte.
+
+        Args:
+            text (str, optional): mots du titre (ex : "GTS", "Targa"), recherchés comme préfixes
+            brand (str, optional): marque (ex : "PORSCHE")
+            model (str, optional): modèle (ex : "PORSCHE_911")
+            year_min (int, optional): année minimale
+            year_max (int, optional): année maximale
+            price_min (float, optional): prix courant minimal
+            price_max (float, optional): prix courant maximal
+            mileage_min (int, optional): kilométrage minimal
+            mileage_max (int, optional): kilométrage maximal
+            gearbox (str, optional): boîte de vitesse (ex : "Automatique")
+            include_removed (bool, optional): inclut les annonces retirées du site
+            order_by (str, optional): tri parmi SEARCH_ORDERS
+            descending (bool, optional): tri décroissant
+            after (tuple, optional): curseur renvoyé pour la page précédente
+            limit (int, optional): nombre d'annonces par page
+
+        Returns:
+            tuple[list[CarRow], tuple | None]: annonces de la page, curseur de la page suivante
+            (None s'il s'agit de la dernière)
+
+        Raises:
+            ValueError: si le tri est inconnu
+        """
+        column = SEARCH_ORDERS.get(order_by)
+        if column is None:
+            raise ValueError(f"Tri inconnu : {order_by} (tris possibles : {', '.join(SEARCH_ORDERS)})")
+        conditions = [f"{column} IS NOT NULL"]
+        params = []
+        if not include_removed:
+            conditions.append("removed_date IS NULL")
+        filters = (
+            ("brand = ?", brand), ("model = ?", model), ("gearbox = ?", gearbox),
+            ("year >= ?", year_min), ("year <= ?", year_max),
+            ("current_price >= ?", price_min), ("current_price <= ?", price_max),
+            ("mileage >= ?", mileage_min), ("mileage <= ?", mileage_max),
+        )
+        for condition, value in filters:
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        rare_words = []
+        for word in re.findall(r"\w+", text or ""):
+            if self._fts and len(word) >= FTS_MIN_WORD and self._count_fts_matches(word) <= FTS_COMMON_WORD:
+                rare_words.append(word)
+            else:
+                conditions.append("title LIKE ?")
+                params.append(f"%{word}%")
+        if rare_words:
+            conditions.append("id IN (SELECT rowid FROM cars_fts WHERE cars_fts MATCH ?)")
+            params.append(fts_query(" ".join(rare_words)))
+        comparison, direction = ("<", "DESC") if descending else (">", "ASC")
+        if after is not None:
+            # The first condition bounds the index range, the row value breaks ties on id
+            conditions.append(f"{column} {comparison}= ? AND ({column}, id) {comparison} (?, ?)")
+            params.extend((after[0], after[0], after[1]))
+        sql = f"""
+            SELECT {', '.join(CAR_COLUMNS)} FROM cars
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {column} {direction}, id {direction}
+            LIMIT ?
+        """
+        # One more row tells whether there is a next page
+        with self._lock:
+            rows = [CarRow._make(row) for row in self._conn.execute(sql, (*params, limit + 1))]
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (getattr(rows[-1], column), rows[-1].id)
+
+    def _count_fts_matches(self, word: str) -> int:
+        # Bounded count: a frequent word costs no more than FTS_COMMON_WORD rows read
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT rowid FROM cars_fts WHERE cars_fts MATCH ? LIMIT ?)",
+                (fts_query(word), FTS_COMMON_WORD + 1)
+            ).fetchone()[0]
+
+    def read_changes(self, after: int = 0, limit: int = 1000, kinds: list[str] | None = None) -> list[CarChange]:
+        """
+        Lit les changements du journal postérieurs à un numéro de séquence, avec l'annonce
+        concernée. Le coût dépend du nombre de changements lus, pas de la taille de la table.
+
+        Args:
+            after (int, optional): numéro de séquence du dernier changement déjà traité
+            limit (int, optional): nombre maximal de changements lus
+            kinds (list[str], optional): types de changements retenus (voir CHANGE_KINDS)
+
+        Returns:
+            list[CarChange]: changements par numéro de séquence croissant ; le numéro du
+            dernier sert de curseur pour l'appel suivant
+        """
+        query = f"""
+            SELECT car_changes.seq, car_changes.kind, car_changes.ad_id, car_changes.old_price, car_changes.new_price,
+                   car_changes.changed_at, {", ".join(f"cars.{column}" for column in CHANGE_COLUMNS[6:])}
+            FROM car_changes
+            LEFT JOIN cars ON cars.id = car_changes.ad_id
+            WHERE car_changes.seq > ?
+        """
+        params = [after]
+        if kinds:
+            unknown = set(kinds) - set(CHANGE_KINDS)
+            if unknown:
+                raise ValueError(f"Type de changement inconnu : {', '.join(sorted(unknown))}")
+            query += f" AND car_changes.kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        query += " ORDER BY car_changes.seq LIMIT ?"
+        with self._lock:
+            return [CarChange._make(row) for row in self._conn.execute(query, (*params, limit))]
+
+    def iter_changes(self, after: int = 0, kinds: list[str] | None = None, batch_size: int = 1000) -> Iterator[CarChange]:
+        """
+        Parcourt tous les changements postérieurs à un numéro de séquence, par blocs de
+        `batch_size` (voir read_changes)
+        """
+        while True:
+            changes = self.read_changes(after, batch_size, kinds)
+            yield from changes
+            if len(changes) < batch_size:
+                return
+            after = changes[-1].seq
+
+    def last_change_seq(self) -> int:
+        """
+        Numéro de séquence du dernier changement du journal : curseur d'un nouveau
+        consommateur qui ne veut que les changements à venir
+        """
+        with self._lock:
+            return self._conn.execute("SELECT IFNULL(MAX(seq), 0) FROM car_changes").fetchone()[0]
+
+    def get_change_cursor(self, consumer: str) -> int:
+        """
+        Curseur d'un consommateur du journal : numéro de séquence du dernier changement
+        qu'il a traité (0 s'il n'a encore rien lu)
+        """
+        value = self.get_metadata(CHANGE_CURSOR_KEY + consumer)
+        return int(value) if value else 0
+
+    def set_change_cursor(self, consumer: str, seq: int):
+        """
+        Enregistre le curseur d'un consommateur, une fois les changements lus traités
+        """
+        self.set_metadata(CHANGE_CURSOR_KEY + consumer, str(seq))
+
+    def purge_changes(self) -> int:
+        """
+        Supprime du journal les changements déjà traités par tous les consommateurs (aucun
+        si aucun consommateur n'a enregistré de curseur)
+
+        Returns:
+            int: nombre de changements supprimés
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MIN(CAST(value AS INTEGER)) FROM metadata WHERE key GLOB ?", (CHANGE_CURSOR_KEY + "*",))
+            oldest = cursor.fetchone()[0]
+            if oldest is None:
+                return 0
+            cursor.execute("DELETE FROM car_changes WHERE seq <= ?", (oldest,))
+            return cursor.rowcount
+
+    def get_all_cars(self) -> list[Cars]:
+        return list(self.iter_cars(as_cars=True))
     
     def update_car(self, car: Cars):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE cars
                 SET brand = ?, model = ?, title = ?, year = ?, original_price = ?, current_price = ?, mileage = ?, gearbox = ?, first_publication_date = ?, update_date = ?
                 WHERE link = ?
             """, (car.brand, car.model, car.title, car.year, car.original_price, car.current_price, car.mileage, car.gearbox, car.first_publication_date, date.today(), car.link))
-            conn.commit()
     
     def update_car_current_price(self, link: str, current_price: float):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE cars
                 SET current_price = ?, update_date = ?
                 WHERE link = ?
             """, (current_price, date.today(), link))
-            conn.commit()
     
     def update_car_first_publication_date(self, link: str, first_publication_date):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE cars
                 SET first_publication_date = ?, update_date = ?
                 WHERE link = ?
             """, (first_publication_date, date.today(), link))
-            conn.commit()
     
-    def calculate_statistics(self) -> dict:
-        with sqlite3.connect(self.db_path) as conn:
+    def update_cars_original_price(self, updates: list[tuple]):
+        """
+        Enregistre en une seule transaction les prix d'origine et dates de première
+        publication récupérés sur les pages des annonces. Une date absente (None) laisse
+        la date déjà connue inchangée.
+
+        Args:
+            updates (list[tuple]): tuples (link, original_price, first_publication_date)
+        """
+        today = date.today()
+        with metrics.timer("db_write_seconds", operation="original_price"), self.transaction() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT brand, model, year, gearbox, round(AVG(current_price)) AS moyenne_prix, round(AVG(mileage)) as moyenne_km \
-                           FROM cars \
-                           WHERE update_date=(select max(update_date) from cars) \
-                           GROUP BY brand, model, year, gearbox;")
+            cursor.executemany("""
+                UPDATE cars
+                SET original_price = ?, first_publication_date = COALESCE(?, first_publication_date), update_date = ?
+                WHERE link = ?
+            """, [(original_price, first_publication_date, today, link) for link, original_price, first_publication_date in updates])
+        metrics.increment("cars_total", len(updates), result="original_price")
+
+    def get_price_history(self, link: str) -> list[tuple]:
+        """
+        Historique des prix d'une annonce
+
+        Args:
+            link (str): lien de l'annonce
+
+        Returns:
+            list[tuple]: relevés (date, prix) par date croissante
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("""
+                SELECT price_observations.observed_on, price_observations.price
+                FROM cars
+                JOIN price_observations ON price_observations.ad_id = cars.id
+                WHERE cars.link = ?
+                ORDER BY price_observations.observed_on
+            """, (link,))
+            return cursor.fetchall()
+
+    def calculate_statistics(self) -> dict:
+        with self._lock:
+            cursor = self._conn.cursor()
+            # Statistics over the active ads, read from the aggregates maintained by triggers
+            cursor.execute("""
+                SELECT brand, model, year, gearbox, ad_count,
+                       round(sum_price / ad_count) AS moyenne_prix,
+                       round(sum_mileage / NULLIF(mileage_count, 0)) AS moyenne_km,
+                       min_price, max_price, sum_price, sum_price_sq
+                FROM car_statistics
+                WHERE ad_count > 0
+                ORDER BY brand, model, year, gearbox
+            """)
             # Return statistics as a dictionary keyed by 'brand|model|year|gearbox'
             rows = cursor.fetchall()
             statistics = {}
             for row in rows:
                 key = f"{row[0]}|{row[1]}|{row[2]}|{row[3]}"
+                mean_price = row[9] / row[4]
                 statistics[key] = {
                     "brand": row[0],
                     "model": row[1],
                     "year": row[2],
                     "gearbox": row[3],
-                    "average_price": row[4],
-                    "average_mileage": row[5]
+                    "ad_count": row[4],
+                    "average_price": row[5],
+                    "average_mileage": row[6],
+                    "min_price": row[7],
+                    "max_price": row[8],
+                    "price_stddev": round(math.sqrt(max(row[10] / row[4] - mean_price * mean_price, 0.0)))
                 }
             return statistics
 
     def export_statistics_to_csv(self, statistics: dict, file_path: str):
         with open(file_path, mode='w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['brand', 'model', 'year', 'gearbox', 'average_price', 'average_mileage']
+            fieldnames = ['brand', 'model', 'year', 'gearbox', 'average_price', 'average_mileage', 'ad_count', 'min_price', 'max_price', 'price_stddev']
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
             for stat in statistics.values():
                 writer.writerow(stat)
     
-    def calculate_duration_on_site_and_price_variation(self):
-        with sqlite3.connect(self.db_path) as conn:
+    def calculate_duration_on_site_and_price_variation(self) -> int:
+        """
+        Calcule la durée de présence sur le site et la variation de prix des annonces
+        modifiées depuis le précédent calcul (les autres n'ont pas changé). Les annonces
+        dont la durée ou la variation change reçoivent la date du jour dans modified_date,
+        pour être reprises par l'export incrémental.
+
+        Returns:
+            int: nombre d'annonces dont la durée ou la variation a changé
+        """
+        today = date.today().isoformat()
+        with self.transaction() as conn:
             cursor = conn.cursor()
+            cursor.execute("SELECT value FROM metadata WHERE key = 'duration_watermark'")
+            row = cursor.fetchone()
+            # Rows updated on the day of the previous run are recomputed, as they may have changed after it
+            watermark = row[0] if row else ""
             cursor.execute("""
                 UPDATE cars
-                SET duration_on_site = round(julianday(update_date) - julianday(first_publication_date)),
-                    price_variation = CASE 
-                        WHEN original_price IS NOT NULL AND original_price > 0 THEN round(((current_price - original_price) / original_price) * 100, 2)
-                        ELSE NULL
-                    END
-                WHERE first_publication_date IS NOT NULL
-            """)
-            conn.commit()
\ No newline at end of file
+                SET duration_on_site = computed.duration_on_site,
+                    price_variation = computed.price_variation,
+                    modified_date = ?
+                FROM (
+                    SELECT id,
+                           round(julianday(update_date) - julianday(first_publication_date)) AS duration_on_site,
+                           CASE
+                               WHEN original_price IS NOT NULL AND original_price > 0 THEN round(((current_price - original_price) / original_price) * 100, 2)
+                               ELSE NULL
+                           END AS price_variation
+                    FROM cars
+                    WHERE update_date >= ? AND first_publication_date IS NOT NULL
+                ) AS computed
+                WHERE cars.id = computed.id
+                  AND (cars.duration_on_site IS NOT computed.duration_on_site OR cars.price_variation IS NOT computed.price_variation)
+            """, (today, watermark))
+            updated = cursor.rowcount
+            cursor.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES ('duration_watermark', ?)", (today,))
+            return updated
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer l'export brut de la table des annonces en CSV, Parquet ou Arrow IPC.
+La table est lue par blocs (fetchmany) et chaque bloc est écrit aussitôt : la mémoire
+utilisée ne dépend que de la taille des blocs et du nombre de partitions, pas du nombre
+d'annonces.
+"""
+
+import csv
+import glob
+import logging
+import os
+from datetime import date, datetime
+from operator import itemgetter
+from src.cars_dao import CarsDAO
+
+EXPORT_FORMATS = ("csv", "parquet", "arrow")
+
+EXPORT_COLUMNS = (
+    "id", "brand", "model", "link", "title", "year", "original_price", "current_price", "mileage", "gearbox",
+    "first_publication_date", "update_date", "duration_on_site", "price_variation", "removed_date",
+)
+
+# Dates are read as datetime objects (see the converters registered in src.cars_dao)
+_ARROW_TYPES = {
+    "id": "int64", "year": "int64", "mileage": "int64", "duration_on_site": "int64",
+    "original_price": "float64", "current_price": "float64", "price_variation": "float64",
+    "first_publication_date": "timestamp", "update_date": "timestamp", "removed_date": "timestamp",
+}
+
+_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self.file = open(path, mode='w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, rows: list[tuple]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class _ArrowWriter:
+    def __init__(self, path: str, export_format: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError(f"Le module pyarrow est nécessaire pour l'export {export_format}") from e
+        self.pa = pa
+        types = {"int64": pa.int64(), "float64": pa.float64(), "timestamp": pa.timestamp("s"), "string": pa.string()}
+        self.schema = pa.schema([(column, types[_ARROW_TYPES.get(column, "string")]) for column in EXPORT_COLUMNS])
+        if export_format == "parquet":
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, rows: list[tuple]):
+        columns = zip(*rows)
+        batch = self.pa.record_batch(
+            [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+def _partition_dir(output_dir: str, export_format: str, partition_by: tuple, key: tuple) -> str:
+    # One tree per format, so that each of them can be read as a dataset
+    parts = [
+        f"{column}={_NULL_PARTITION if value is None or value == '' else str(value).replace(os.sep, '_')}"
+        for column, value in zip(partition_by, key)
+    ]
+    return os.path.join(output_dir, export_format, *parts)
+
+def export_cars(cars_dao: CarsDAO, output_dir: str, formats: tuple = ("csv",), partition_by: tuple = ("brand", "model"),
+                incremental: bool = False, batch_size: int = 10000) -> dict:
+    """
+    Exporte la table des annonces dans un répertoire par format, éventuellement partitionné
+    (répertoires brand=.../model=...).
+
+    Un export complet remplace les fichiers cars.<format> (et supprime les fichiers des
+    exports incrémentaux précédents). Un export incrémental n'écrit, dans de nouveaux
+    fichiers cars-<horodatage>.<format>, que les annonces modifiées (y compris par le calcul
+    des durées et variations de prix) ou retirées depuis la date du précédent export vers
+    le même répertoire. Les dates n'ayant qu'une précision d'un jour, les annonces
+    modifiées le jour du précédent export sont exportées de nouveau : la version la plus
+    récente d'une annonce (link) est celle du dernier fichier.
+
+    Args:
+        cars_dao (CarsDAO): DAO de la base des annonces
+        output_dir (str): répertoire d'export
+        formats (tuple, optional): formats parmi EXPORT_FORMATS
+        partition_by (tuple, optional): colonnes de partitionnement (vide : un seul fichier)
+        incremental (bool, optional): n'exporte que les annonces modifiées depuis le précédent export
+        batch_size (int, optional): nombre de lignes lues et écrites par bloc
+
+    Returns:
+        dict: nombre de lignes exportées, fichiers écrits, date depuis laquelle les annonces
+        ont été exportées (None pour un export complet)
+
+    Raises:
+        ValueError: si un format ou une colonne de partitionnement est inconnu, ou si pyarrow
+            est absent pour un export Parquet ou Arrow
+    """
+    unknown = [export_format for export_format in formats if export_format not in EXPORT_FORMATS]
+    unknown += [column for column in partition_by if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Format ou colonne d'export inconnu : {', '.join(unknown)}")
+
+    watermark_key = f"export_watermark:{os.path.abspath(output_dir)}"
+    since = cars_dao.get_metadata(watermark_key) if incremental else None
+    started_on = date.today().isoformat()
+    if since is None:
+        file_name = "cars"
+        for export_format in formats:
+            for path in glob.glob(os.path.join(glob.escape(output_dir), export_format, "**", f"cars*.{export_format}"), recursive=True):
+                os.remove(path)
+    else:
+        file_name = f"cars-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}"
+
+    key_indexes = [EXPORT_COLUMNS.index(column) for column in partition_by]
+    if len(key_indexes) > 1:
+        partition_key = itemgetter(*key_indexes)
+    else:
+        partition_key = lambda row: tuple(row[index] for index in key_indexes)
+    writers = {}
+    buffers = {}
+    rows_count = 0
+
+    def flush(key: tuple):
+        rows = buffers.pop(key)
+        if key not in writers:
+            writers[key] = []
+            for export_format in formats:
+                directory = _partition_dir(output_dir, export_format, partition_by, key)
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f"{file_name}.{export_format}")
+                writers[key].append(_CsvWriter(path) if export_format == "csv" else _ArrowWriter(path, export_format))
+        for writer in writers[key]:
+            writer.write(rows)
+
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM cars"
+    params = ()
+    if since is not None:
+        query += " WHERE update_date >= ? OR removed_date >= ? OR modified_date >= ?"
+        params = (since, since, since)
+    try:
+        with cars_dao.read_cursor() as cursor:
+            cursor.execute(query, params)
+            while rows := cursor.fetchmany(batch_size):
+                for row in rows:
+                    key = partition_key(row)
+                    buffer = buffers.setdefault(key, [])
+                    buffer.append(row)
+                    if len(buffer) >= batch_size:
+                        flush(key)
+                rows_count += len(rows)
+        for key in list(buffers):
+            flush(key)
+    finally:
+        for partition_writers in writers.values():
+            for writer in partition_writers:
+                writer.close()
+
+    cars_dao.set_metadata(watermark_key, started_on)
+    files = sorted(
+        os.path.join(_partition_dir(output_dir, export_format, partition_by, key), f"{file_name}.{export_format}")
+        for key in writers for export_format in formats
+    )
+    logging.info(f"Export de {rows_count} annonces dans {len(files)} fichiers sous {output_dir}")
+    return {"rows": rows_count, "files": files, "since": since}
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer le cache disque des réponses HTTP, stocké dans une base sqlite
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    fresh: bool
+
+class ResponseCache:
+    """
+    Cache des réponses indexé par URL. Les corps sont compressés (zlib) ; une réponse plus
+    récente que `ttl` est servie sans requête, une réponse plus ancienne est revalidée par
+    une requête conditionnelle (If-None-Match / If-Modified-Since). Les entrées plus
+    anciennes que `max_age` sont supprimées, puis les moins récemment utilisées tant que la
+    taille totale dépasse `max_size`. En mode rejeu, seules les réponses en cache sont
+    servies, sans aucun accès au réseau.
+    """
+
+    def __init__(self, db_path: str = "http_cache.db", ttl: int = 3600, max_age: int = 7 * 86400,
+                 max_size: int = 200 * 1024 * 1024, replay: bool = False):
+        """
+        Args:
+            db_path (str, optional): chemin de la base sqlite du cache
+            ttl (int, optional): durée en secondes pendant laquelle une réponse est servie sans requête
+            max_age (int, optional): âge en secondes au-delà duquel une réponse est supprimée
+            max_size (int, optional): taille totale maximale des corps compressés, en octets
+            replay (bool, optional): mode rejeu hors ligne
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_size = max_size
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)")
+        self._total_size = 0
+        self._expire()
+
+    @classmethod
+    def from_config(cls, cache_config: dict) -> 'ResponseCache':
+        """
+        Construit le cache à partir de la section "http_cache" de la configuration
+        """
+        return cls(
+            db_path=cache_config.get("path", "http_cache.db"),
+            ttl=cache_config.get("ttl", 3600),
+            max_age=cache_config.get("max_age", 7 * 86400),
+            max_size=cache_config.get("max_size_mb", 200) * 1024 * 1024,
+            replay=cache_config.get("replay", False)
+        )
+
+    def get(self, url: str) -> CachedResponse | None:
+        """
+        Args:
+            url (str): URL demandée
+
+        Returns:
+            CachedResponse: réponse en cache, None si l'URL n'est pas en cache
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))
+        body, etag, last_modified, fetched_at = row
+        return CachedResponse(zlib.decompress(body), etag, last_modified, now - fetched_at < self.ttl)
+
+    def store(self, url: str, body: bytes, etag: str | None = None, last_modified: str | None = None):
+        """
+        Enregistre (ou remplace) la réponse d'une URL puis évince les réponses les moins
+        récemment utilisées si la taille maximale est dépassée
+        """
+        compressed = zlib.compress(body)
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO responses (url, body, size, etag, last_modified, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (url, compressed, len(compressed), etag, last_modified, now, now))
+            self._total_size += len(compressed) - (previous[0] if previous else 0)
+            if self._total_size > self.max_size:
+                self._evict_lru()
+
+    def iter_responses(self, url_pattern: str = "%", batch_size: int = 100):
+        """
+        Parcourt les réponses en cache dont l'URL correspond au motif (LIKE), par blocs de
+        `batch_size` lus par ordre d'URL, sans modifier leur date d'accès
+
+        Args:
+            url_pattern (str, optional): motif des URL (syntaxe LIKE de sqlite)
+            batch_size (int, optional): nombre de réponses lues par requête
+
+        Yields:
+            tuple[str, bytes, float]: URL, corps décompressé et date de téléchargement (timestamp)
+        """
+        last_url = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT url, body, fetched_at FROM responses WHERE url > ? AND url LIKE ? ORDER BY url LIMIT ?",
+                    (last_url, url_pattern, batch_size)
+                ).fetchall()
+            for url, body, fetched_at in rows:
+                yield url, zlib.decompress(body), fetched_at
+            if len(rows) < batch_size:
+                return
+            last_url = rows[-1][0]
+
+    def refresh(self, url: str):
+        """
+        Marque comme fraîche une réponse revalidée par le serveur (304 Not Modified)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+
+    def _expire(self):
+        """
+        Supprime les réponses plus anciennes que max_age
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.max_age,))
+            self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict_lru(self):
+        """
+        Supprime les réponses les moins récemment utilisées jusqu'à revenir sous max_size
+        (à appeler verrou pris)
+        """
+        evicted = []
+        cursor = self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at")
+        for url, size in cursor:
+            if self._total_size <= self.max_size:
+                break
+            evicted.append((url,))
+            self._total_size -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+
+    def count(self, counter: str):
+        """
+        Incrémente l'un des compteurs de la session (hits, misses ou revalidated)
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def report(self):
+        """
+        Journalise les compteurs de la session
+        """
+        logging.info(f"Cache HTTP : {self.hits} succès, {self.revalidated} revalidations, {self.misses} échecs")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer les mesures d'un crawl : compteurs (requêtes, retries, réponses 429,
+annonces insérées, mises à jour, inchangées...) et histogrammes de durées (latence des
+requêtes, attente du limiteur de débit, analyse des pages, écritures en base). Les mesures
+sont regroupées dans un registre partagé par tous les modules, puis écrites en fin
+d'exécution dans un rapport JSON et, si besoin, au format texte de Prometheus.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Bornes supérieures (en secondes) des intervalles des histogrammes
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_PREFIX = "lbc_"
+
+class Histogram:
+    """
+    Distribution d'une mesure : nombre, somme, minimum, maximum et effectif par intervalle
+    """
+    __slots__ = ("buckets", "bucket_counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+def _label_text(labels: tuple, extra: str = "") -> str:
+    parts = [f'{label}="{value}"' for label, value in labels] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Metrics:
+    """
+    Registre de mesures utilisable depuis plusieurs threads. Chaque mesure est identifiée
+    par un nom et des étiquettes facultatives (ex : status="429").
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Remet toutes les mesures à zéro (début d'exécution)
+        """
+        with self._lock:
+            self.started_at = datetime.now()
+            self._start = time.perf_counter()
+            self.counters = {}
+            self.histograms = {}
+
+    def increment(self, name: str, value: int = 1, **labels):
+        """
+        Incrémente un compteur
+
+        Args:
+            name (str): nom du compteur
+            value (int, optional): valeur à ajouter
+            **labels: étiquettes du compteur
+        """
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Ajoute une valeur à un histogramme
+
+        Args:
+            name (str): nom de l'histogramme
+            value (float): valeur observée (en secondes pour une durée)
+            **labels: étiquettes de l'histogramme
+        """
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Mesure la durée du bloc dans un histogramme
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name: str, **labels) -> int:
+        """
+        Valeur courante d'un compteur (0 s'il n'a jamais été incrémenté)
+        """
+        with self._lock:
+            return self.counters.get(_key(name, labels), 0)
+
+    def report(self, **extra) -> dict:
+        """
+        Instantané de toutes les mesures
+
+        Args:
+            **extra: informations ajoutées au rapport (commande, configuration...)
+
+        Returns:
+            dict: rapport sérialisable en JSON
+        """
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "duration_seconds": round(time.perf_counter() - self._start, 3),
+                **extra,
+                "counters": {name + _label_text(labels): value for (name, labels), value in sorted(self.counters.items())},
+                "histograms": {name + _label_text(labels): histogram.to_dict()
+                               for (name, labels), histogram in sorted(self.histograms.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Mesures au format texte d'exposition de Prometheus
+
+        Returns:
+            str: une ligne par série
+        """
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = PROMETHEUS_PREFIX + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{_label_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                metric = PROMETHEUS_PREFIX + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += bucket_count
+                    bucket_labels = _label_text(labels, f'le="{bound}"')
+                    lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+                bucket_labels = _label_text(labels, 'le="+Inf"')
+                lines.append(f"{metric}_bucket{bucket_labels} {histogram.count}")
+                lines.append(f"{metric}_sum{_label_text(labels)} {histogram.sum}")
+                lines.append(f"{metric}_count{_label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, file_path: str, **extra):
+        """
+        Écrit le rapport JSON de l'exécution
+        """
+        with open(file_path, mode='w', encoding='utf-8') as report_file:
+            json.dump(self.report(**extra), report_file, indent=4, ensure_ascii=False)
+
+    def write_prometheus(self, file_path: str):
+        """
+        Écrit les mesures au format texte de Prometheus (pour le textfile collector de node_exporter)
+        """
+        with open(file_path, mode='w', encoding='utf-8') as prometheus_file:
+            prometheus_file.write(self.to_prometheus())
+
+# Registre commun à tous les modules
+metrics = Metrics()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer l'analyse des pages HTML dans un pool de processus. L'analyse
+BeautifulSoup est limitée par le GIL : pour les gros volumes (relecture du cache HTTP après
+un changement de balisage, pages d'annonces), les pages brutes (bytes) sont envoyées par
+blocs à des processus qui renvoient des dictionnaires simples.
+"""
+
+import logging
+import os
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from urllib.parse import parse_qs, urlparse
+from src.cars_dao import CarsDAO
+from src.http_cache import ResponseCache
+from src.pipeline import cars_from_announcements, parse_announcements
+from src.scrapping import article_content_scrapper
+
+def _parse_search_pages(contents: list[bytes], parser_backend: str, json_first: bool) -> list[tuple]:
+    results = []
+    for content in contents:
+        try:
+            results.append((parse_announcements(content, parser_backend, json_first), None))
+        except ValueError as e:
+            results.append((None, str(e)))
+    return results
+
+def _parse_articles(contents: list[bytes], list_var: list) -> list[tuple]:
+    results = []
+    for content in contents:
+        try:
+            results.append((article_content_scrapper(content, list_var), None))
+        except ValueError as e:
+            results.append((None, str(e)))
+    return results
+
+class ParsePool:
+    """
+    Pool de processus d'analyse. Les pages sont soumises par blocs de `chunksize` (un bloc
+    par tâche, pour amortir le coût des échanges entre processus) et au plus
+    2 x `workers` blocs sont en cours à la fois, de sorte que la source des pages est
+    consommée au fur et à mesure.
+    """
+
+    def __init__(self, workers: int | None = None, chunksize: int = 8):
+        """
+        Args:
+            workers (int, optional): nombre de processus (par défaut, nombre de cœurs)
+            chunksize (int, optional): nombre de pages envoyées à un processus par tâche
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    @classmethod
+    def from_config(cls, pool_config: dict) -> 'ParsePool':
+        """
+        Construit le pool à partir de la section "parse_pool" de la configuration
+        """
+        return cls(workers=pool_config.get("workers"), chunksize=pool_config.get("chunksize", 8))
+
+    def map(self, function: Callable, pages: Iterable[tuple], *args, ordered: bool = True) -> Iterator[tuple]:
+        """
+        Applique une fonction d'analyse aux pages dans les processus du pool
+
+        Args:
+            function (Callable): fonction de module appelée avec (liste de pages, *args), qui
+                renvoie un couple (résultat, erreur) par page
+            pages (Iterable[tuple]): couples (clé, contenu brut) ; seul le contenu est envoyé
+                aux processus
+            *args: arguments supplémentaires de la fonction
+            ordered (bool, optional): renvoie les résultats dans l'ordre des pages plutôt que
+                dès qu'un bloc est terminé
+
+        Yields:
+            tuple: couples (clé, résultat) ; le résultat est None si la page n'a pas pu être
+            analysée (l'erreur est journalisée)
+        """
+        pages = iter(pages)
+        pending = deque()
+
+        def submit() -> bool:
+            chunk = [page for _, page in zip(range(self.chunksize), pages)]
+            if not chunk:
+                return False
+            keys = [key for key, _ in chunk]
+            pending.append((self._executor.submit(function, [content for _, content in chunk], *args), keys))
+            return True
+
+        def results(future, keys: list) -> Iterator[tuple]:
+            for key, (result, error) in zip(keys, future.result()):
+                if error is not None:
+                    logging.error(f"Analyse impossible de la page {key} : {error}")
+                yield key, result
+
+        while len(pending) < 2 * self.workers and submit():
+            pass
+        while pending:
+            if ordered:
+                future, keys = pending.popleft()
+                yield from results(future, keys)
+            else:
+                done, _ = wait([future for future, _ in pending], return_when=FIRST_COMPLETED)
+                for item in [item for item in pending if item[0] in done]:
+                    pending.remove(item)
+                    yield from results(*item)
+            while len(pending) < 2 * self.workers and submit():
+                pass
+
+    def parse_search_pages(self, pages: Iterable[tuple], parser_backend: str = "html.parser", json_first: bool = False,
+                           ordered: bool = True) -> Iterator[tuple]:
+        """
+        Extrait les annonces de pages de résultats (voir src.pipeline.parse_announcements)
+
+        Yields:
+            tuple: couples (clé, annonces de la page)
+        """
+        return self.map(_parse_search_pages, pages, parser_backend, json_first, ordered=ordered)
+
+    def parse_articles(self, pages: Iterable[tuple], list_var: list, ordered: bool = True) -> Iterator[tuple]:
+        """
+        Extrait les informations de pages d'annonces (voir src.scrapping.article_content_scrapper)
+
+        Yields:
+            tuple: couples (clé, informations extraites)
+        """
+        return self.map(_parse_articles, pages, list_var, ordered=ordered)
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> 'ParsePool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def reparse_cached_pages(cache: ResponseCache, cars_dao: CarsDAO, pool: ParsePool, parser_backend: str = "html.parser",
+                         json_first: bool = False) -> dict:
+    """
+    Analyse de nouveau les pages de résultats conservées dans le cache HTTP (par exemple
+    après un changement de balisage du site) et enregistre les annonces extraites. La
+    marque et le modèle sont lus dans les paramètres de l'URL de chaque page ; les pages
+    qui ne les contiennent pas sont ignorées. Les annonces des pages relues sont
+    enregistrées à la date de téléchargement de la page : celles mises à jour depuis ne
+    sont pas modifiées (voir CarsDAO.upsert_cars).
+
+    Args:
+        cache (ResponseCache): cache HTTP
+        cars_dao (CarsDAO): DAO dans lequel enregistrer les annonces
+        pool (ParsePool): pool d'analyse
+        parser_backend (str, optional): moteur d'analyse des pages de résultats
+        json_first (bool, optional): lit d'abord les annonces dans le JSON embarqué des pages
+
+    Returns:
+        dict: nombre de pages relues, ignorées et en erreur, d'annonces insérées, mises à
+        jour et inchangées
+    """
+    stats = {"pages": 0, "skipped": 0, "failed": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+
+    def search_pages() -> Iterator[tuple]:
+        for url, body, fetched_at in cache.iter_responses("%/recherche%"):
+            query = parse_qs(urlparse(url).query)
+            if "u_car_brand" not in query or "u_car_model" not in query:
+                stats["skipped"] += 1
+                continue
+            yield (url, query["u_car_brand"][0], query["u_car_model"][0], date.fromtimestamp(fetched_at)), body
+
+    # The database writes are the only sequential part, so pages are handled as soon as they are parsed
+    for (url, brand, model, fetched_on), announcements in pool.parse_search_pages(search_pages(), parser_backend, json_first, ordered=False):
+        if announcements is None:
+            stats["failed"] += 1
+            continue
+        inserted, updated, unchanged = cars_dao.upsert_cars(cars_from_announcements(announcements, brand, model), observed_on=fetched_on)
+        stats["pages"] += 1
+        stats["inserted"] += inserted
+        stats["updated"] += updated
+        stats["unchanged"] += unchanged
+    logging.info(
+        f"Pages du cache relues : {stats['pages']} (ignorées : {stats['skipped']}, en erreur : {stats['failed']}) - "
+        f"Annonces insérées : {stats['inserted']} - mises à jour : {stats['updated']} - inchangées : {stats['unchanged']}"
+    )
+    return stats
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer les différents moteurs d'analyse des pages de résultats. Tous renvoient,
+pour chaque annonce, le même dictionnaire que results_scrapper_detail
+"""
+
+import logging
+from bs4 import SoupStrainer
+from src.scrapping import parsed_soup, results_scrapper, results_scrapper_detail
+
+CARD_TAG = "div"
+CARD_CLASS = "relative h-[inherit] group/adcard"
+CARD_FIELDS = ["link", "title", "year", "current_price", "mileage", "gearbox"]
+CARD_STRAINER = SoupStrainer(CARD_TAG, class_=CARD_CLASS)
+
+# Moteurs disponibles (clé "parser" de la configuration) :
+#  - html.parser : BeautifulSoup sur le parseur de la bibliothèque standard
+#  - lxml : BeautifulSoup sur le parseur lxml
+#    (tous deux limités aux cartes d'annonces par un SoupStrainer : le reste de la page n'est
+#    jamais construit, ce qui divise par trois la mémoire et le temps d'analyse d'une page)
+#  - xpath : lxml.html seul, avec des expressions XPath compilées une fois pour toutes
+PARSER_BACKENDS = ("html.parser", "lxml", "xpath")
+
+def _soup_parser(content: bytes, features: str, strainer: SoupStrainer | None) -> list[dict]:
+    announcements = []
+    with parsed_soup(content, features, strainer) as soup:
+        for article in results_scrapper(soup, CARD_TAG, CARD_CLASS):
+            try:
+                announcements.append(results_scrapper_detail(article, CARD_FIELDS))
+            except ValueError:
+                logging.error(f"Article concerné : {article}")
+                raise
+    return announcements
+
+_xpath = None
+
+def _compile_xpath() -> dict:
+    """
+    Compile (une seule fois) les expressions XPath équivalentes aux recherches de
+    results_scrapper_detail
+    """
+    global _xpath
+    if _xpath is None:
+        from lxml import etree
+
+        def has_class(name: str) -> str:
+            return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+        def labelled_value(label: str) -> etree.XPath:
+            return etree.XPath(f'.//p[{has_class("text-neutral")}][. = "{label}"][1]/following-sibling::p[1]')
+
+        _xpath = {
+            "cards": etree.XPath(f'//{CARD_TAG}[@class = "{CARD_CLASS}"]'),
+            "link": etree.XPath('.//a[@class = "absolute inset-0"][@aria-label = "Voir l’annonce"][1]/@href'),
+            "title": etree.XPath('.//span[@class = "absolute inset-0 opacity-0"][1]/@title'),
+            "price": etree.XPath(f'.//span[{has_class("text-success")}][1]'),
+            "price_fallback": etree.XPath('.//span[@class = ""][1]'),
+            "year": labelled_value("Année"),
+            "mileage": labelled_value("Kilométrage"),
+            "gearbox": labelled_value("Boîte de vitesse"),
+        }
+    return _xpath
+
+def _text(elements: list) -> str | None:
+    if not elements:
+        return None
+    return "".join(elements[0].itertext()).strip()
+
+def _xpath_card(card, xpath: dict) -> dict:
+    """
+    Équivalent XPath de results_scrapper_detail (mêmes clés, mêmes erreurs)
+    """
+    link = xpath["link"](card)
+    if not link:
+        raise ValueError(f"Élément 'link' non trouvé dans l'article")
+    title = xpath["title"](card)
+    if not title:
+        raise ValueError(f"Élément 'title' non trouvé dans l'article")
+
+    year = _text(xpath["year"](card))
+    if year is None:
+        raise ValueError(f"Élément 'year' non trouvé dans l'article")
+    try:
+        year = int(year)
+    except ValueError:
+        raise ValueError(f"Impossible de convertir l'année en entier dans l'article")
+
+    price = _text(xpath["price"](card)) or _text(xpath["price_fallback"](card))
+    if not price:
+        raise ValueError(f"TÉlément 'span' du prix non trouvé dans l'article")
+    try:
+        current_price = int(price.replace(" ", "").replace("€", ""))
+    except ValueError:
+        raise ValueError(f"Impossible de convertir le prix en entier dans l'article")
+
+    mileage = _text(xpath["mileage"](card))
+    if mileage is None:
+        raise ValueError(f"Élément 'mileage' non trouvé dans l'article")
+    try:
+        mileage = int(mileage.replace(" km", ""))
+    except ValueError:
+        raise ValueError(f"Impossible de convertir le kilométrage en entier dans l'article")
+
+    gearbox = _text(xpath["gearbox"](card))
+    if gearbox is None:
+        raise ValueError(f"Élément 'gearbox' non trouvé dans l'article")
+
+    return {"brand": "", "model": "", "link": link[0], "title": title[0].removeprefix("Voir l’annonce: "), "year": year, "original_price": None, "current_price": current_price, "mileage": mileage, "gearbox": gearbox}
+
+def _xpath_parser(content: bytes) -> list[dict]:
+    import lxml.html
+    xpath = _compile_xpath()
+    document = lxml.html.fromstring(content)
+    announcements = []
+    for card in xpath["cards"](document):
+        try:
+            announcements.append(_xpath_card(card, xpath))
+        except ValueError:
+            logging.error(f"Article concerné : {lxml.html.tostring(card, encoding='unicode')}")
+            raise
+    return announcements
+
+def parse_search_page(content: bytes, backend: str = "html.parser") -> list[dict]:
+    """
+    Extrait les annonces d'une page de résultats avec le moteur demandé
+
+    Args:
+        content (bytes): contenu brut de la page de résultats
+        backend (str, optional): moteur d'analyse, parmi PARSER_BACKENDS
+
+    Returns:
+        list[dict]: une entrée par annonce, au format de results_scrapper_detail
+
+    Raises:
+        ValueError: si le moteur est inconnu ou si une annonce ne peut pas être analysée
+    """
+    if backend == "html.parser":
+        return _soup_parser(content, "html.parser", CARD_STRAINER)
+    if backend == "lxml":
+        return _soup_parser(content, "lxml", CARD_STRAINER)
+    if backend == "xpath":
+        return _xpath_parser(content)
+    raise ValueError(f"Moteur d'analyse inconnu : {backend} (attendu : {', '.join(PARSER_BACKENDS)})")
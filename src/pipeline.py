@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer le crawl des pages de résultats sous forme de pipeline : téléchargement,
+analyse et enregistrement en base s'exécutent en parallèle dans trois étages reliés par des
+files d'attente bornées
+"""
+
+import logging
+import queue
+import threading
+import time
+from src.cars import Cars
+from src.cars_dao import CarsDAO
+from src.metrics import metrics
+from src.parsers import parse_search_page
+from src.scrapping import Scraper, next_page_scrapper, search_json_scrapper
+
+# Marqueur de fin de flux transmis d'un étage au suivant
+_END = object()
+
+def parse_announcements(content: bytes, parser_backend: str = "html.parser", json_first: bool = False) -> list[dict]:
+    """
+    Extrait les annonces d'une page de résultats. En mode JSON, les annonces sont lues dans
+    le JSON embarqué de la page (avec leur prix d'origine et leur date de première
+    publication) ; l'analyse du DOM n'est utilisée que si ce JSON est absent ou incomplet.
+
+    Args:
+        content (bytes): contenu brut de la page de résultats
+        parser_backend (str, optional): moteur d'analyse (voir src.parsers.PARSER_BACKENDS)
+        json_first (bool, optional): lit d'abord le JSON embarqué de la page
+
+    Returns:
+        list[dict]: annonces de la page, au format de results_scrapper_detail
+
+    Raises:
+        ValueError: si une annonce ne peut pas être analysée
+    """
+    announcements = search_json_scrapper(content) if json_first else None
+    if announcements is None:
+        if json_first:
+            logging.warning("JSON des annonces absent de la page, analyse du DOM")
+        announcements = parse_search_page(content, parser_backend)
+    return announcements
+
+def cars_from_announcements(announcements: list[dict], brand_filter: str, model_filter: str) -> list[Cars]:
+    """
+    Construit les objets Cars d'une recherche à partir des annonces extraites
+    """
+    list_car = []
+    for announcement in announcements:
+        car = Cars.from_dict(announcement)
+        car.brand = brand_filter
+        car.model = model_filter
+        list_car.append(car)
+    return list_car
+
+def parse_cars(content: bytes, brand_filter: str, model_filter: str, parser_backend: str = "html.parser",
+               json_first: bool = False) -> list[Cars]:
+    """
+    Construit les annonces d'une page de résultats (voir parse_announcements)
+
+    Args:
+        content (bytes): contenu brut de la page de résultats
+        brand_filter (str): marque recherchée
+        model_filter (str): modèle recherché
+        parser_backend (str, optional): moteur d'analyse (voir src.parsers.PARSER_BACKENDS)
+        json_first (bool, optional): lit d'abord le JSON embarqué de la page
+
+    Returns:
+        list[Cars]: annonces de la page
+
+    Raises:
+        ValueError: si une annonce ne peut pas être analysée
+    """
+    return cars_from_announcements(parse_announcements(content, parser_backend, json_first), brand_filter, model_filter)
+
+def crawl_search(scraper: Scraper, cars_dao: CarsDAO, url: str, brand_filter: str, model_filter: str,
+                 queue_size: int = 2, parser_backend: str = "html.parser", json_first: bool = False,
+                 incremental: bool = False, stop_after_pages: int = 1, on_page=None, track_removed: bool = True) -> dict:
+    """
+    Parcourt les pages d'une recherche. La page N+1 est téléchargée pendant que la page N
+    est analysée puis enregistrée ; la politesse envers le site reste assurée par le
+    limiteur de débit du Scraper, seul étage à émettre des requêtes.
+
+    En mode incrémental (recherche triée par date décroissante), le crawl s'arrête dès que
+    `stop_after_pages` pages consécutives ne contiennent que des annonces connues au prix
+    inchangé. Les annonces de la recherche non vues sont ensuite marquées comme retirées :
+    toutes si la dernière page a été atteinte, sinon seulement celles publiées après la
+    plus ancienne date de tri vue (les seules qui auraient nécessairement été listées).
+
+    Args:
+        scraper (Scraper): client HTTP
+        cars_dao (CarsDAO): DAO dans lequel enregistrer les annonces
+        url (str): URL de la première page de résultats
+        brand_filter (str): marque recherchée
+        model_filter (str): modèle recherché
+        queue_size (int, optional): nombre de pages pouvant attendre entre deux étages
+        parser_backend (str, optional): moteur d'analyse des pages de résultats
+        json_first (bool, optional): lit d'abord les annonces dans le JSON embarqué des pages
+        incremental (bool, optional): active l'arrêt anticipé sur les pages déjà connues
+        stop_after_pages (int, optional): nombre de pages inchangées consécutives avant l'arrêt
+        on_page (callable, optional): appelé avec l'URL de chaque page une fois enregistrée
+        track_removed (bool, optional): marque les annonces non vues comme retirées (à
+            désactiver lorsque le crawl reprend en cours de recherche). Après un arrêt
+            anticipé, seules les annonces publiées après la dernière annonce vue sont
+            concernées, et aucune si les annonces n'étaient pas triées de la plus récente
+            à la plus ancienne
+
+    Returns:
+        dict: nombre de pages, d'annonces insérées, mises à jour, inchangées et retirées,
+        temps passé dans chaque étage ; "aborted" est vrai si une page n'a pas pu être
+        téléchargée (le crawl s'est arrêté avant la dernière page)
+
+    Raises:
+        ValueError: si une annonce ne peut pas être analysée (le crawl est alors interrompu)
+    """
+    pages_queue = queue.Queue(maxsize=queue_size)
+    cars_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    stats = {"pages": 0, "inserted": 0, "updated": 0, "unchanged": 0, "removed": 0, "last_page_reached": False,
+             "stopped_early": False, "aborted": False, "fetch_time": 0.0, "parse_time": 0.0, "persist_time": 0.0}
+    seen_links = set()
+    # Publication date of the last card seen, only meaningful while cards are sorted newest first
+    last_index_date = None
+    index_dates_sorted = True
+
+    def put(target: queue.Queue, item) -> bool:
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(source: queue.Queue):
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def fetch_stage():
+        current_url = url
+        try:
+            while current_url:
+                logging.info(f"Scrapping de la page : {current_url}")
+                start = time.perf_counter()
+                content = scraper.fetch(current_url)
+                if content is None:
+                    logging.error(f"Impossible de récupérer la page : {current_url}")
+                    stats["aborted"] = True
+                    break
+                next_page = next_page_scrapper(content)
+                elapsed = time.perf_counter() - start
+                stats["fetch_time"] += elapsed
+                metrics.observe("stage_seconds", elapsed, stage="fetch")
+                if not put(pages_queue, (current_url, content)):
+                    return
+                current_url = scraper.absolute_url(next_page) if next_page else None
+            else:
+                stats["last_page_reached"] = True
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        put(pages_queue, _END)
+
+    def parse_stage():
+        try:
+            while (item := get(pages_queue)) is not _END:
+                page_url, content = item
+                start = time.perf_counter()
+                announcements = parse_announcements(content, parser_backend, json_first)
+                index_dates = [announcement["index_date"] for announcement in announcements if announcement.get("index_date")]
+                list_car = cars_from_announcements(announcements, brand_filter, model_filter)
+                elapsed = time.perf_counter() - start
+                stats["parse_time"] += elapsed
+                metrics.observe("stage_seconds", elapsed, stage="parse")
+                if not put(cars_queue, (page_url, list_car, index_dates)):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        put(cars_queue, _END)
+
+    threads = [threading.Thread(target=fetch_stage, name="fetch"), threading.Thread(target=parse_stage, name="parse")]
+    for thread in threads:
+        thread.start()
+    start_crawl = time.perf_counter()
+    unchanged_pages = 0
+    try:
+        while (item := get(cars_queue)) is not _END:
+            page_url, list_car, index_dates = item
+            logging.info(f"Nombre d'annonces trouvées sur la page {page_url} : {len(list_car)}")
+            start = time.perf_counter()
+            inserted, updated, unchanged = cars_dao.upsert_cars(list_car)
+            elapsed = time.perf_counter() - start
+            stats["persist_time"] += elapsed
+            metrics.observe("stage_seconds", elapsed, stage="persist")
+            # upsert_cars counts an ad listed twice on the page (sponsored or bumped) only once
+            page_unchanged = bool(list_car) and unchanged == len({car.link for car in list_car})
+            metrics.increment("pages_total", result="unchanged" if page_unchanged else "changed")
+            stats["pages"] += 1
+            stats["inserted"] += inserted
+            stats["updated"] += updated
+            stats["unchanged"] += unchanged
+            seen_links.update(car.link for car in list_car)
+            for index_date in index_dates:
+                # A sponsored or bumped ad out of order makes the bound meaningless
+                if last_index_date is not None and index_date > last_index_date:
+                    index_dates_sorted = False
+                last_index_date = index_date
+            logging.info(f"Annonces insérées : {inserted} - Annonces mises à jour : {updated} - Annonces inchangées : {unchanged}")
+            if on_page is not None:
+                on_page(page_url)
+            unchanged_pages = unchanged_pages + 1 if page_unchanged else 0
+            if incremental and unchanged_pages >= stop_after_pages:
+                logging.info(f"Arrêt anticipé : {unchanged_pages} page(s) consécutive(s) sans nouveauté")
+                stats["stopped_early"] = True
+                metrics.increment("early_stops_total")
+                break
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    # Ads that were not seen during this run have been removed from the site
+    if track_removed and stats["last_page_reached"] and not stats["stopped_early"]:
+        stats["removed"] = cars_dao.mark_removed(brand_filter, model_filter, seen_links)
+    elif track_removed and stats["stopped_early"] and index_dates_sorted and last_index_date is not None:
+        # Every ad published after the last card of the last page has been seen
+        stats["removed"] = cars_dao.mark_removed(brand_filter, model_filter, seen_links, published_since=last_index_date)
+    logging.info(f"Annonces retirées du site : {stats['removed']}")
+
+    elapsed = time.perf_counter() - start_crawl
+    logging.info(
+        f"Pipeline terminé : {stats['pages']} pages en {elapsed:.1f}s - "
+        f"téléchargement {stats['fetch_time']:.1f}s, analyse {stats['parse_time']:.1f}s, "
+        f"enregistrement {stats['persist_time']:.1f}s"
+    )
+    return stats
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer la limitation du débit des requêtes envoyées au site
+"""
+
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from src.metrics import metrics
+
+class TokenBucket:
+    """
+    Limiteur de débit à seau de jetons, partagé entre threads : le seau se remplit de `rate`
+    jetons par seconde jusqu'à `burst` jetons, chaque requête en consomme un. Un appelant qui
+    ne trouve pas de jeton réserve le prochain et attend son tour, ce qui garantit un débit
+    moyen borné quel que soit le nombre de requêtes concurrentes.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate (float): nombre moyen de requêtes autorisées par seconde (<= 0 : illimité)
+            burst (int, optional): nombre de requêtes pouvant partir sans attendre
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        Consomme un jeton (éventuellement par anticipation)
+
+        Returns:
+            float: durée en secondes à attendre avant de pouvoir envoyer la requête
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate: float):
+        """
+        Modifie le débit ; les jetons accumulés jusque-là l'ont été à l'ancien débit
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self.rate = rate
+
+    def acquire(self) -> float:
+        """
+        Bloque jusqu'à ce qu'une requête puisse être envoyée
+
+        Returns:
+            float: durée d'attente en secondes
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Convertit l'en-tête Retry-After (nombre de secondes ou date HTTP) en secondes
+
+    Args:
+        value (str | None): valeur de l'en-tête
+
+    Returns:
+        float | None: délai en secondes, None si l'en-tête est absent ou invalide
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _HostState:
+    __slots__ = ("bucket", "blocked_until", "last_change")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.blocked_until = 0.0
+        self.last_change = time.monotonic()
+
+class AdaptiveRateLimiter:
+    """
+    Limiteur de débit adaptatif, un seau de jetons par hôte, réglé en AIMD : tant que les
+    réponses arrivent sans limitation et avec une latence inférieure à `latency_target`, le
+    débit augmente de `increase` requête/s chaque seconde (jusqu'à `max_rate`) ; une
+    réponse 429/503 ou une page de blocage le multiplie par `decrease` (jusqu'à `min_rate`)
+    et suspend les requêtes vers l'hôte pendant la durée de Retry-After (ou un intervalle
+    au nouveau débit). Les réponses limitées qui arrivent pendant cette pause (requêtes
+    parties en même temps) prolongent la pause sans réduire de nouveau le débit. Avec
+    `min_rate` = `max_rate`, le débit est fixe mais les pauses sont respectées.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1, min_rate: float | None = None, max_rate: float | None = None,
+                 increase: float = 0.05, decrease: float = 0.5, latency_target: float = 1.0, max_retry_after: float = 120.0):
+        """
+        Args:
+            rate (float, optional): débit initial en requêtes par seconde
+            burst (int, optional): nombre de requêtes pouvant partir sans attendre
+            min_rate (float, optional): débit minimal (par défaut, débit initial)
+            max_rate (float, optional): débit maximal (par défaut, débit initial)
+            increase (float, optional): augmentation du débit par seconde sans limitation
+            decrease (float, optional): facteur appliqué au débit après une limitation
+            latency_target (float, optional): latence en secondes en dessous de laquelle le débit augmente
+            max_retry_after (float, optional): pause maximale en secondes, quel que soit Retry-After
+        """
+        self.initial_rate = rate
+        self.burst = burst
+        self.min_rate = rate if min_rate is None else min_rate
+        self.max_rate = rate if max_rate is None else max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.max_retry_after = max_retry_after
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, rate_limit: dict) -> 'AdaptiveRateLimiter':
+        """
+        Construit le limiteur à partir de la section "rate_limit" de la configuration
+        """
+        return cls(
+            rate=rate_limit.get("rate", 0.5),
+            burst=rate_limit.get("burst", 1),
+            min_rate=rate_limit.get("min_rate"),
+            max_rate=rate_limit.get("max_rate"),
+            increase=rate_limit.get("increase", 0.05),
+            decrease=rate_limit.get("decrease", 0.5),
+            latency_target=rate_limit.get("latency_target", 1.0),
+            max_retry_after=rate_limit.get("max_retry_after", 120.0)
+        )
+
+    def _host(self, url: str | None) -> tuple[str, _HostState]:
+        host = urlparse(url).netloc if url else ""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(TokenBucket(self.initial_rate, self.burst))
+        return host, state
+
+    def acquire(self, url: str | None = None) -> float:
+        """
+        Bloque jusqu'à ce qu'une requête vers l'hôte de l'URL puisse être envoyée
+
+        Args:
+            url (str, optional): URL de la requête
+
+        Returns:
+            float: durée d'attente en secondes
+        """
+        _, state = self._host(url)
+        waited = 0.0
+        while True:
+            pause = state.blocked_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+                waited += pause
+            waited += state.bucket.acquire()
+            # A pause may have started while waiting for the token
+            if time.monotonic() >= state.blocked_until:
+                return waited
+
+    def record(self, url: str | None, latency: float, throttled: bool = False, retry_after: float | None = None):
+        """
+        Ajuste le débit de l'hôte d'après une réponse
+
+        Args:
+            url (str | None): URL de la requête
+            latency (float): durée de la requête en secondes
+            throttled (bool, optional): réponse 429/503 ou page de blocage
+            retry_after (float, optional): délai demandé par le serveur (Retry-After)
+        """
+        host, state = self._host(url)
+        with self._lock:
+            now = time.monotonic()
+            rate = state.bucket.rate
+            if throttled:
+                paused = now < state.blocked_until
+                if not paused:
+                    rate = max(self.min_rate, rate * self.decrease)
+                pause = min(self.max_retry_after, retry_after if retry_after is not None else 1 / rate)
+                state.blocked_until = max(state.blocked_until, now + pause)
+                state.last_change = state.blocked_until
+                if paused:
+                    return
+                metrics.increment("rate_limit_changes_total", direction="down")
+                logging.warning(f"Limitation par {host} : pause de {pause:.1f}s, débit réduit à {rate:.2f} requêtes/s")
+            elif latency <= self.latency_target and rate < self.max_rate and now - state.last_change >= 1.0:
+                rate = min(self.max_rate, rate + self.increase)
+                state.last_change = now
+                metrics.increment("rate_limit_changes_total", direction="up")
+            else:
+                return
+        state.bucket.set_rate(rate)
+
+    def rates(self) -> dict[str, float]:
+        """
+        Débit courant de chaque hôte
+        """
+        with self._lock:
+            return {host: state.bucket.rate for host, state in self._hosts.items()}
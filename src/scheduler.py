@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Module pour gérer le crawl de plusieurs recherches (couples marque / modèle) en parallèle
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.cars_dao import CarsDAO
+from src.pipeline import crawl_search
+from src.scrapping import Scraper
+
+def search_url(url_template: str, brand: str, model: str) -> str:
+    """
+    Substitue la marque et le modèle dans l'URL de recherche de la configuration
+    """
+    return url_template.replace("u_car_brand=?", f"u_car_brand={brand}").replace("u_car_model=?", f"u_car_model={model}")
+
+def load_searches(config: dict) -> list[dict]:
+    """
+    Liste des recherches de la configuration : clé "searches" ([{"brand": ..., "model": ...}])
+    ou, à défaut, le couple historique "brand_filter" / "model_filter"
+
+    Returns:
+        list[dict]: recherches, chacune avec les clés brand et model
+    """
+    searches = config.get("searches")
+    if searches:
+        return [{"brand": search["brand"], "model": search.get("model", "")} for search in searches]
+    return [{"brand": config.get("brand_filter", ""), "model": config.get("model_filter", "")}]
+
+def crawl_searches(scraper: Scraper, cars_dao: CarsDAO, url_template: str, searches: list[dict],
+                   workers: int = 2, **crawl_options) -> dict:
+    """
+    Crawle les recherches avec au plus `workers` recherches en cours simultanément. Toutes
+    partagent le même Scraper, donc le même limiteur de débit vers le site, et le même
+    CarsDAO dont la connexion unique sérialise les écritures. L'avancement de chaque
+    recherche est enregistré en base : un run interrompu reprend à la dernière page
+    enregistrée des recherches non terminées ou interrompues par une page inaccessible.
+
+    Args:
+        scraper (Scraper): client HTTP partagé
+        cars_dao (CarsDAO): DAO partagé
+        url_template (str): URL de recherche contenant u_car_brand=? et u_car_model=?
+        searches (list[dict]): recherches à crawler (clés brand et model)
+        workers (int, optional): nombre de recherches crawlées en parallèle
+        **crawl_options: options transmises à crawl_search
+
+    Returns:
+        dict: statistiques de crawl_search par recherche ('brand|model'), None pour une recherche en échec
+
+    Raises:
+        ValueError: si une annonce ne peut pas être analysée
+    """
+    searches_by_key = {f"{search['brand']}|{search['model']}": search for search in searches}
+    pending = cars_dao.start_crawl_jobs(list(searches_by_key))
+    skipped = len(searches_by_key) - len(pending)
+    if skipped:
+        logging.info(f"Reprise du run interrompu : {skipped} recherche(s) déjà terminée(s)")
+
+    def run_job(search_key: str, resume_url: str | None) -> dict:
+        search = searches_by_key[search_key]
+        logging.info(f"Démarrage de la recherche {search_key}" + (f" (reprise à {resume_url})" if resume_url else ""))
+        cars_dao.update_crawl_job(search_key, "running")
+        stats = crawl_search(
+            scraper,
+            cars_dao,
+            resume_url or search_url(url_template, search["brand"], search["model"]),
+            search["brand"],
+            search["model"],
+            on_page=lambda page_url: cars_dao.update_crawl_job(search_key, "running", last_page_url=page_url),
+            track_removed=resume_url is None,
+            **crawl_options
+        )
+        if stats["aborted"]:
+            # Keeps the last saved page, from which the next run resumes
+            cars_dao.update_crawl_job(search_key, "failed")
+        else:
+            cars_dao.update_crawl_job(search_key, "done", stats=stats)
+        return stats
+
+    results = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search") as executor:
+        futures = {executor.submit(run_job, key, resume_url): key for key, resume_url in pending.items()}
+        for future in as_completed(futures):
+            search_key = futures[future]
+            try:
+                results[search_key] = future.result()
+                if results[search_key]["aborted"]:
+                    logging.error(f"Recherche {search_key} interrompue après {results[search_key]['pages']} pages, reprise au prochain run")
+                else:
+                    logging.info(f"Recherche {search_key} terminée : {results[search_key]['pages']} pages")
+            except Exception as e:
+                logging.error(f"Échec de la recherche {search_key} : {e}")
+                cars_dao.update_crawl_job(search_key, "failed")
+                results[search_key] = None
+                errors.append(e)
+    if errors and isinstance(errors[0], ValueError):
+        raise errors[0]
+    return results
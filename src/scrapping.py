@@ -4,15 +4,328 @@ Module pour gérer les fonctions liées au scrapping
 """
 
 import logging
-import logging
+from contextlib import contextmanager
 from datetime import datetime
 import requests
 import json
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from src.http_cache import ResponseCache
+from src.metrics import metrics
+
+BASE_URL = "https://www.leboncoin.fr"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Accept-Language": "fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Referer": "https://www.google.com/"
+}
+
+# With a rate limiter, 429 and 503 are not retried by urllib3 (which would otherwise sleep for
+# Retry-After itself): Scraper.fetch hands them to the rate limiter, which slows down every
+# thread. Without one, urllib3 retries them after the delay asked by the server.
+DEFAULT_RETRIES = {
+    "total": 3,
+    "backoff_factor": 0.5,
+    "status_forcelist": [500, 502, 504],
+    "respect_retry_after_header": False
+}
+
+THROTTLE_STATUSES = (429, 503)
+
+# Signatures des pages de blocage anti-robot renvoyées à la place de la page demandée
+DEFAULT_BLOCK_MARKERS = ("geo.captcha-delivery.com",)
+
+# Taille maximale d'une réponse (après décompression), au-delà de laquelle le téléchargement
+# est interrompu ; les pages du site font quelques centaines de Ko
+DEFAULT_MAX_RESPONSE_SIZE = 10 * 1024 * 1024
+
+# Taille des blocs lus sur la connexion
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """
+    Réponse dépassant la taille maximale acceptée par le Scraper
+    """
+
+class CountingRetry(Retry):
+    """
+    Politique de retry urllib3 qui compte chaque nouvelle tentative (par code HTTP ou type
+    d'erreur), ainsi que les réponses qui l'ont provoquée (429, 503...) et que requests ne
+    voit jamais
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None:
+            metrics.increment("http_retries_total", reason=str(response.status))
+            metrics.increment("http_responses_total", status=str(response.status))
+        else:
+            metrics.increment("http_retries_total", reason=type(error).__name__ if error else "unknown")
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+class Scraper:
+    """
+    Client HTTP réutilisable pour toute la durée d'un crawl : une seule session requests
+    dont les connexions (keep-alive) sont conservées dans un pool et réutilisées d'une
+    requête à l'autre, avec une politique de retry pour les erreurs transitoires. Le client
+    est utilisable depuis plusieurs threads ; le limiteur de débit éventuel est alors commun
+    à toutes les requêtes. Les réponses 429/503 et les pages de blocage sont signalées au
+    limiteur, qui ralentit et suspend les requêtes vers l'hôte, puis la requête est refaite ;
+    sans limiteur, urllib3 les refait après le délai demandé par le serveur. Les réponses
+    sont lues par blocs et abandonnées dès qu'elles dépassent la taille maximale, sans
+    jamais être chargées en entier.
+    """
+
+    def __init__(self, base_url: str = BASE_URL, headers: dict | None = None, timeout: int = 10,
+                 pool_size: int = 10, retries: dict | None = None, rate_limiter: AdaptiveRateLimiter | None = None,
+                 cache: ResponseCache | None = None, throttle_retries: int = 3, block_markers: tuple = DEFAULT_BLOCK_MARKERS,
+                 max_response_size: int | None = DEFAULT_MAX_RESPONSE_SIZE):
+        """
+        Args:
+            base_url (str, optional): URL du site, préfixée aux liens relatifs des annonces
+            headers (dict, optional): en-têtes HTTP supplémentaires ou de remplacement
+            timeout (int, optional): timeout en secondes des requêtes
+            pool_size (int, optional): nombre de connexions conservées par hôte
+            retries (dict, optional): paramètres urllib3 Retry remplaçant DEFAULT_RETRIES
+            rate_limiter (AdaptiveRateLimiter, optional): limiteur appliqué avant chaque requête
+            cache (ResponseCache, optional): cache disque consulté avant chaque requête
+            throttle_retries (int, optional): nombre de nouvelles tentatives après une limitation
+            block_markers (tuple, optional): textes identifiant une page de blocage
+            max_response_size (int, optional): taille maximale d'une réponse en octets (None : illimitée)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.throttle_retries = throttle_retries
+        self.block_markers = tuple(marker.encode() for marker in block_markers)
+        self.max_response_size = max_response_size
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+
+        retry_params = {**DEFAULT_RETRIES, **(retries or {})}
+        if rate_limiter is None:
+            retry_params["status_forcelist"] = [*retry_params["status_forcelist"], *THROTTLE_STATUSES]
+            retry_params["respect_retry_after_header"] = True
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=CountingRetry(allowed_methods=["GET", "HEAD"], **retry_params)
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'Scraper':
+        """
+        Construit le client à partir de la configuration (clés "base_url", "http", "rate_limit" et "http_cache")
+
+        Args:
+            config (dict): configuration chargée par load_config
+
+        Returns:
+            Scraper: client HTTP configuré
+        """
+        http_config = config.get("http", {})
+        rate_limit = config.get("rate_limit")
+        rate_limiter = AdaptiveRateLimiter.from_config(rate_limit) if rate_limit else None
+        cache_config = config.get("http_cache", {})
+        cache = ResponseCache.from_config(cache_config) if cache_config.get("enabled", False) else None
+        return cls(
+            base_url=config.get("base_url", BASE_URL),
+            headers=http_config.get("headers"),
+            timeout=http_config.get("timeout", 10),
+            pool_size=http_config.get("pool_size", 10),
+            retries=http_config.get("retries"),
+            rate_limiter=rate_limiter,
+            cache=cache,
+            throttle_retries=rate_limit.get("throttle_retries", 3) if rate_limit else 0,
+            block_markers=http_config.get("block_markers", DEFAULT_BLOCK_MARKERS),
+            max_response_size=http_config.get("max_response_size", DEFAULT_MAX_RESPONSE_SIZE)
+        )
+
+    def absolute_url(self, link: str) -> str:
+        """
+        Préfixe un lien relatif du site (ex : /ad/voitures/123) par l'URL de base
+        """
+        if link.startswith("http://") or link.startswith("https://"):
+            return link
+        return self.base_url + link
+
+    def fetch(self, url: str, headers: dict | None = None, timeout: int | None = None) -> bytes | None:
+        """
+        Télécharge le contenu brut de la page, ou le lit dans le cache s'il y est encore frais.
+        Une réponse en cache mais périmée est revalidée par une requête conditionnelle.
+
+        Args:
+            url (str): URL de la page web
+            headers (dict, optional): en-têtes HTTP propres à cette requête
+            timeout (int, optional): timeout en secondes remplaçant celui du client
+
+        Returns:
+            bytes: contenu de la page, None en cas d'erreur
+        """
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None and (cached.fresh or self.cache.replay):
+                self.cache.count("hits")
+                metrics.increment("http_cache_total", result="hit")
+                return cached.body
+            if self.cache.replay:
+                self.cache.count("misses")
+                metrics.increment("http_cache_total", result="miss")
+                logging.warning(f"Page absente du cache (mode rejeu) : {url}")
+                return None
+            if cached is not None:
+                headers = dict(headers or {})
+                if cached.etag:
+                    headers["If-None-Match"] = cached.etag
+                if cached.last_modified:
+                    headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            result = self._get(url, headers, timeout)
+            if result is None:
+                return None
+            response, body = result
+            if response.status_code == 304 and cached is not None:
+                self.cache.count("revalidated")
+                metrics.increment("http_cache_total", result="revalidated")
+                self.cache.refresh(url)
+                return cached.body
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            metrics.increment("http_errors_total", error=type(e).__name__)
+            logging.error(f"HTTP error occurred: {e}")
+            return None
+        except requests.exceptions.RequestException as e:
+            metrics.increment("http_errors_total", error=type(e).__name__)
+            logging.error(f"Request error occurred: {e}")
+            return None
+        if self.cache is not None:
+            self.cache.count("misses")
+            metrics.increment("http_cache_total", result="miss")
+            self.cache.store(url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return body
+
+    def _read_body(self, response: requests.Response) -> bytes:
+        """
+        Lit le corps d'une réponse ouverte en streaming, par blocs, en s'arrêtant dès que la
+        taille maximale est dépassée (annoncée par Content-Length ou constatée en cours de
+        lecture). La connexion est rendue au pool si la réponse a été lue en entier, fermée
+        sinon.
+
+        Raises:
+            ResponseTooLarge: si la réponse dépasse la taille maximale
+        """
+        limit = self.max_response_size
+        try:
+            length = response.headers.get("Content-Length")
+            if limit is not None and length and length.isdigit() and int(length) > limit:
+                raise ResponseTooLarge(f"Réponse de {int(length)} octets (maximum {limit}) : {response.url}")
+            body = bytearray()
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                body += chunk
+                if limit is not None and len(body) > limit:
+                    raise ResponseTooLarge(f"Réponse de plus de {limit} octets : {response.url}")
+            return bytes(body)
+        finally:
+            response.close()
+
+    def _throttle_reason(self, response: requests.Response, body: bytes) -> str | None:
+        """
+        Motif de limitation de la réponse : code 429/503, "block" pour une page de blocage,
+        None pour une réponse normale
+        """
+        if response.status_code in THROTTLE_STATUSES:
+            return str(response.status_code)
+        if response.status_code != 304 and any(marker in body for marker in self.block_markers):
+            return "block"
+        return None
+
+    def _get(self, url: str, headers: dict | None, timeout: int | None) -> tuple[requests.Response, bytes] | None:
+        """
+        Envoie la requête au rythme du limiteur, en la refaisant tant que le serveur la limite
+        (au plus throttle_retries fois)
+
+        Returns:
+            tuple[requests.Response, bytes]: réponse et son corps, None si le serveur la limite
+            encore après les nouvelles tentatives
+
+        Raises:
+            ResponseTooLarge: si la réponse dépasse la taille maximale
+        """
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                metrics.observe("rate_limit_wait_seconds", self.rate_limiter.acquire(url))
+            metrics.increment("http_requests_total")
+            # Includes the retries made by urllib3
+            with metrics.timer("http_request_seconds"):
+                response = self.session.get(url, headers=headers, timeout=timeout or self.timeout, stream=True)
+                body = self._read_body(response)
+            metrics.increment("http_responses_total", status=str(response.status_code))
+            metrics.increment("http_bytes_total", len(body))
+            reason = self._throttle_reason(response, body)
+            if self.rate_limiter is not None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self.rate_limiter.record(url, response.elapsed.total_seconds(), reason is not None, retry_after)
+            if reason is None:
+                return response, body
+            metrics.increment("http_throttled_total", reason=reason)
+            if self.rate_limiter is None or attempt >= self.throttle_retries:
+                metrics.increment("http_errors_total", error="Throttled")
+                logging.error(f"Requête limitée par le serveur ({reason}) après {attempt + 1} tentatives : {url}")
+                return None
+            attempt += 1
+
+    def get_soup(self, url: str, headers: dict | None = None, timeout: int | None = None) -> BeautifulSoup | None:
+        """
+        Charge la page web correspondant à l'url
+
+        Args:
+            url (str): URL de la page web à scrapper
+            headers (dict, optional): en-têtes HTTP propres à cette requête
+            timeout (int, optional): timeout en secondes remplaçant celui du client
+
+        Returns:
+            BeautifulSoup: objet soup de la page, None en cas d'erreur
+        """
+        content = self.fetch(url, headers=headers, timeout=timeout)
+        if content is None:
+            return None
+        return BeautifulSoup(content, 'html.parser')
+
+    def close(self):
+        self.session.close()
+        if self.rate_limiter is not None:
+            rates = ", ".join(f"{host or '-'} {rate:.2f}/s" for host, rate in self.rate_limiter.rates().items())
+            if rates:
+                logging.info(f"Débit final du limiteur : {rates}")
+        if self.cache is not None:
+            self.cache.report()
+            self.cache.close()
+
+    def __enter__(self) -> 'Scraper':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_scraper = None
 
 def url_scrapper(url: str, headers: dict | None = None, timeout: int = 10):
     """
-    Charge la page web correspond à l'url
+    Charge la page web correspond à l'url, via un client Scraper partagé par tous les appels
     
     Args:
         url (str): URL de la page web à scrapper
@@ -22,39 +335,48 @@ def url_scrapper(url: str, headers: dict | None = None, timeout: int = 10):
     Returns:
         BeautifulSoup: objet soup de la page
     """
-    session = requests.Session()
+    global _default_scraper
+    if _default_scraper is None:
+        _default_scraper = Scraper()
+    return _default_scraper.get_soup(url, headers=headers, timeout=timeout)
 
-    default_headers = {
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
-        "Accept-Language": "fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Referer": "https://www.google.com/"
-    }
-    if headers:
-        default_headers.update(headers)
-    session.headers.update(default_headers)
-
-    # Retry simple pour erreurs transitoires
-    from requests.adapters import HTTPAdapter
-    from urllib3.util.retry import Retry
-    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET", "HEAD"])
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
 
+@contextmanager
+def parsed_soup(content: bytes, features: str = 'html.parser', strainer: SoupStrainer | None = None):
+    """
+    Construit l'arbre d'une page, limité aux balises retenues par `strainer`, et le libère
+    à la sortie du bloc
+
+    Args:
+        content (bytes): contenu brut de la page
+        features (str, optional): parseur utilisé par BeautifulSoup
+        strainer (SoupStrainer, optional): balises à construire (None : toute la page)
+
+    Yields:
+        BeautifulSoup: arbre de la page, inutilisable après le bloc
+    """
+    soup = BeautifulSoup(content, features, parse_only=strainer)
     try:
-        response = session.get(url, timeout=timeout)
-        response.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        print(f"HTTP error occurred: {e}")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"Request error occurred: {e}")
-        return None
-    
-    soup = BeautifulSoup(response.content, 'html.parser')
-    return soup
+        yield soup
+    finally:
+        # The tree is freed now rather than by the garbage collector (parent/child links form cycles)
+        soup.decompose()
 
+NEXT_PAGE_STRAINER = SoupStrainer("a", attrs={"aria-label": "Page suivante"})
+
+def next_page_scrapper(content: bytes) -> str | None:
+    """
+    Extrait le lien vers la page de résultats suivante sans construire l'arbre complet de la page
+    
+    Args:
+        content (bytes): contenu brut de la page de résultats
+    
+    Returns:
+        str: lien (relatif) de la page suivante, None s'il s'agit de la dernière page
+    """
+    with parsed_soup(content, strainer=NEXT_PAGE_STRAINER) as soup:
+        link = soup.find("a")
+        return link.get("href") if link is not None else None
 
 def results_scrapper(soup: BeautifulSoup, tag: str, class_name: str, attrs: dict | None = None):
     """
@@ -194,4 +516,67 @@ def article_scrapper(article: BeautifulSoup, list_var: list):
         except (KeyError, TypeError):
             pass
         return {"old_price": old_price, "first_publication_date": first_publication_date}
-    return {"old_price": None, "first_publication_date": None}
\ No newline at end of file
+    return {"old_price": None, "first_publication_date": None}
+
+NEXT_DATA_STRAINER = SoupStrainer("script", attrs={"type": "application/json"})
+
+def article_content_scrapper(content: bytes, list_var: list) -> dict:
+    """
+    Extrait les informations d'une annonce depuis le contenu brut de sa page, en ne
+    construisant que la balise script du JSON embarqué (voir article_scrapper)
+
+    Args:
+        content (bytes): contenu brut de la page de l'annonce
+        list_var (list): liste contenant les variables attendues
+
+    Returns:
+        dict: dictionnaire des informations extraites
+    """
+    with parsed_soup(content, strainer=NEXT_DATA_STRAINER) as soup:
+        return article_scrapper(soup, list_var)
+
+def _search_ad_to_dict(ad: dict) -> dict:
+    """
+    Convertit une annonce du JSON d'une page de résultats au format de results_scrapper_detail,
+    complété du prix d'origine et de la date de première publication
+    """
+    attributes = {item['key']: item for item in ad['attributes']}
+    current_price = ad['price'][0]
+    old_price = attributes.get('old_price')
+    return {
+        "brand": "",
+        "model": "",
+        "link": urlparse(ad['url']).path,
+        "title": ad['subject'],
+        "year": int(attributes['regdate']['value']),
+        # Comme lors de la récupération sur la page de l'annonce, le prix courant fait office de prix d'origine à défaut d'ancien prix
+        "original_price": float(old_price['value']) if old_price else float(current_price),
+        "current_price": current_price,
+        "mileage": int(attributes['mileage']['value']),
+        "gearbox": attributes['gearbox']['value_label'],
+        "first_publication_date": datetime.strptime(ad['first_publication_date'], "%Y-%m-%d %H:%M:%S"),
+        # Date de tri des résultats récents, utilisée par le crawl incrémental
+        "index_date": datetime.strptime(ad.get('index_date') or ad['first_publication_date'], "%Y-%m-%d %H:%M:%S")
+    }
+
+def search_json_scrapper(content: bytes) -> list[dict] | None:
+    """
+    Extrait toutes les annonces d'une page de résultats depuis le JSON embarqué
+    (props.pageProps.searchData.ads), sans parcourir le DOM carte par carte
+    
+    Args:
+        content (bytes): contenu brut de la page de résultats
+    
+    Returns:
+        list[dict]: annonces de la page, None si le JSON est absent ou incomplet
+    """
+    with parsed_soup(content, strainer=NEXT_DATA_STRAINER) as soup:
+        tag = soup.find('script')
+        text = tag.get_text(strip=True) if tag is not None else None
+    if text is None:
+        return None
+    try:
+        data = json.loads(text)
+        return [_search_ad_to_dict(ad) for ad in data['props']['pageProps']['searchData']['ads']]
+    except (KeyError, TypeError, IndexError, ValueError):
+        return None
@@ -0,0 +1,23 @@
+"""
+Fixtures communes des tests : serveur HTTP local (benchmarks.http_stub) et base sqlite temporaire
+"""
+
+import pytest
+from benchmarks.http_stub import StubServer
+from src.cars_dao import CarsDAO
+
+
+@pytest.fixture
+def stub():
+    with StubServer(pages=3) as server:
+        yield server
+
+
+@pytest.fixture
+def cars_dao(tmp_path):
+    with CarsDAO(str(tmp_path / "cars.db")) as dao:
+        yield dao
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: test long (plus de 30 s), à exclure avec -m 'not slow'")
@@ -0,0 +1,26 @@
+from datetime import datetime
+from benchmarks.http_stub import FIRST_AD_ID
+from src.backfill import run_backfill
+from src.cars import Cars
+from src.scrapping import Scraper
+
+
+def _car(link: str, current_price: float) -> Cars:
+    return Cars("PORSCHE", "PORSCHE_911", link, "Porsche 911", 2015, 0, current_price, 50000, "Manuelle")
+
+
+def test_backfill_fills_original_prices(stub, cars_dao):
+    """Pages des annonces récupérées en parallèle ; une page inaccessible est comptée sans bloquer les autres"""
+    cars = [_car(f"/ad/voitures/{FIRST_AD_ID + i}", 40000 + (i * 137) % 60000) for i in range(7)]
+    cars_dao.upsert_cars([*cars, _car("/annonce-supprimee", 10000)])
+    with Scraper(stub.url) as scraper:
+        updated, failed = run_backfill(scraper, cars_dao, cars_dao.iter_cars_missing_original_price(),
+                                       concurrency=3, batch_size=2)
+    assert (updated, failed) == (7, 1)
+    rows = {car.link: car for car in cars_dao.iter_cars()}
+    for i, car in enumerate(cars):
+        # Without an old price on the ad page, the current price is the original one
+        expected = 45000 + (i * 137) % 60000 if i % 3 == 0 else car.current_price
+        assert rows[car.link].original_price == expected
+        assert rows[car.link].first_publication_date == datetime(2025, 1 + i % 12, 1 + i % 28, 10, i % 60)
+    assert [car.link for car in cars_dao.iter_cars_missing_original_price()] == ["/annonce-supprimee"]
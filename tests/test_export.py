@@ -0,0 +1,29 @@
+from datetime import date, datetime, timedelta
+from src.cars import Cars
+from src.export import export_cars
+
+
+def _car(i: int) -> Cars:
+    return Cars("PORSCHE", "PORSCHE_911", f"/ad/voitures/{i}", f"Porsche 911 n°{i}", 2015, 60000, 55000 + i, 50000,
+                "Manuelle", first_publication_date=datetime(2025, 1, 1))
+
+
+def test_incremental_export_includes_recomputed_durations(cars_dao, tmp_path):
+    """Le calcul des durées et variations, qui ne touche pas update_date, est repris par l'export incrémental"""
+    output_dir = str(tmp_path / "export")
+    cars_dao.upsert_cars([_car(i) for i in range(3)], observed_on=date.today() - timedelta(days=2))
+    assert export_cars(cars_dao, output_dir)["rows"] == 3
+    assert export_cars(cars_dao, output_dir, incremental=True)["rows"] == 0
+
+    assert cars_dao.calculate_duration_on_site_and_price_variation() == 3
+    assert export_cars(cars_dao, output_dir, incremental=True)["rows"] == 3
+    # Values that do not change are not rewritten
+    assert cars_dao.calculate_duration_on_site_and_price_variation() == 0
+
+
+def test_incremental_export_includes_removed_ads(cars_dao, tmp_path):
+    output_dir = str(tmp_path / "export")
+    cars_dao.upsert_cars([_car(i) for i in range(3)], observed_on=date.today() - timedelta(days=2))
+    export_cars(cars_dao, output_dir)
+    assert cars_dao.mark_removed("PORSCHE", "PORSCHE_911", {"/ad/voitures/0"}) == 2
+    assert export_cars(cars_dao, output_dir, incremental=True)["rows"] == 2
@@ -0,0 +1,28 @@
+import json
+import subprocess
+import sys
+import pytest
+from benchmarks.bench_startup import ROOT, prepare
+
+# Modules of the scraping and analytics stacks, too slow to import for the read-only commands
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "lxml", "numpy", "pyarrow")
+
+SCRIPT = """
+import json, sys
+import main
+main.main(sys.argv[1:])
+print(json.dumps(sorted(name for name in {modules} if name in sys.modules)))
+"""
+
+
+@pytest.fixture(scope="module")
+def config_path(tmp_path_factory):
+    return prepare(str(tmp_path_factory.mktemp("startup")), rows=200)
+
+
+@pytest.mark.parametrize("command", [["stats"], ["query", "--text", "911", "--limit", "5"], ["changes", "--limit", "5"]])
+def test_command_does_not_import_scraping_stack(config_path, command):
+    """stats, query et changes démarrent sans importer requests, BeautifulSoup ni numpy"""
+    result = subprocess.run([sys.executable, "-c", SCRIPT.format(modules=HEAVY_MODULES), "--config", config_path, *command],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout.splitlines()[-1]) == []
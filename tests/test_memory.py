@@ -0,0 +1,20 @@
+import os
+import pytest
+from benchmarks.bench_memory import anon_growth, replay_crawl
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="mémoire lue dans /proc (Linux)"),
+]
+
+# The links seen during the crawl (35,000 for 1,000 pages) are kept to mark the removed ads and
+# account for about 4 MB; the sqlite page caches are filled during the warm-up
+MAX_GROWTH_MB = 10.0
+
+
+def test_memory_stays_flat_over_long_replayed_crawl():
+    """Crawl de 1 000 pages rejoué depuis le cache HTTP : la mémoire anonyme reste stable après l'échauffement"""
+    samples, crawl, backfill, _ = replay_crawl(pages=1000, articles=200)
+    assert len(samples) == 1000
+    _, growth = anon_growth(samples + [crawl, backfill])
+    assert growth < MAX_GROWTH_MB
@@ -0,0 +1,49 @@
+import pytest
+from bs4 import BeautifulSoup
+from benchmarks.fixtures import article_page_html, search_page_html
+from src.parsers import CARD_CLASS, CARD_FIELDS, CARD_TAG, PARSER_BACKENDS, parse_search_page
+from src.scrapping import (article_content_scrapper, article_scrapper, next_page_scrapper, results_scrapper,
+                           results_scrapper_detail)
+
+# Markup outside the ad cards, with a close class name, that the strainers must leave out
+PADDING = '<div class="relative h-[inherit]"><p class="text-body-1 font-bold">Publicité</p></div>' * 20
+
+
+def _page(page: int, pages: int = 3) -> bytes:
+    return search_page_html(page, pages).replace("<body>", "<body>" + PADDING, 1).encode()
+
+
+def _full_tree_cards(content: bytes) -> list[dict]:
+    soup = BeautifulSoup(content, "html.parser")
+    return [results_scrapper_detail(article, CARD_FIELDS) for article in results_scrapper(soup, CARD_TAG, CARD_CLASS)]
+
+
+@pytest.mark.parametrize("backend", PARSER_BACKENDS)
+@pytest.mark.parametrize("page", [1, 3])
+def test_search_page_matches_full_tree(backend, page):
+    """Chaque moteur, limité aux cartes d'annonces, renvoie les mêmes annonces que l'arbre complet"""
+    content = _page(page)
+    expected = _full_tree_cards(content)
+    assert len(expected) == 35
+    assert parse_search_page(content, backend) == expected
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        parse_search_page(_page(1), "regex")
+
+
+@pytest.mark.parametrize("page, expected", [(1, "/recherche?page=2"), (3, None)])
+def test_next_page_matches_full_tree(page, expected):
+    content = _page(page)
+    link = BeautifulSoup(content, "html.parser").find("a", attrs={"aria-label": "Page suivante"})
+    assert next_page_scrapper(content) == (link.get("href") if link else None) == expected
+
+
+@pytest.mark.parametrize("i", [0, 1])
+def test_article_content_matches_full_tree(i):
+    content = article_page_html(i).encode()
+    fields = ["old_price", "first_publication_date"]
+    result = article_content_scrapper(content, fields)
+    assert result == article_scrapper(BeautifulSoup(content, "html.parser"), fields)
+    assert (result["old_price"] is not None) == (i % 3 == 0)
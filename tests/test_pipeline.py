@@ -0,0 +1,26 @@
+from benchmarks.fixtures import card_html, search_page_html
+from benchmarks.http_stub import StubServer
+from src.pipeline import crawl_search
+from src.scrapping import Scraper
+
+PAGES = 3
+
+
+def _routes() -> dict:
+    """Pages de résultats dont la première liste deux fois la même annonce (annonce mise en avant)"""
+    routes = {f"/recherche?page={page}": search_page_html(page, PAGES).encode() for page in range(1, PAGES + 1)}
+    routes["/recherche?page=1"] = search_page_html(1, PAGES).replace('<div class="grid">', '<div class="grid">' + card_html(3), 1).encode()
+    return routes
+
+
+def test_incremental_crawl_stops_on_unchanged_page_with_duplicate_ad(cars_dao):
+    with StubServer(pages=PAGES, routes=_routes()) as stub, Scraper(stub.url) as scraper:
+        url = f"{stub.url}/recherche?page=1"
+        first = crawl_search(scraper, cars_dao, url, "PORSCHE", "PORSCHE_911")
+        assert (first["pages"], first["inserted"], first["last_page_reached"]) == (PAGES, 35 * PAGES, True)
+
+        second = crawl_search(scraper, cars_dao, url, "PORSCHE", "PORSCHE_911", incremental=True, stop_after_pages=1)
+    assert second["stopped_early"]
+    assert second["pages"] == 1
+    assert (second["inserted"], second["updated"], second["unchanged"]) == (0, 0, 35)
+    assert second["removed"] == 0
@@ -0,0 +1,64 @@
+import time
+from benchmarks.http_stub import StubServer
+from src.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from src.scrapping import Scraper
+
+URL = "https://www.leboncoin.fr/recherche"
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("bientôt") is None
+
+
+def test_throttled_response_pauses_host_for_retry_after():
+    """Un 429 réduit le débit et suspend l'hôte pendant Retry-After ; les autres hôtes ne sont pas touchés"""
+    limiter = AdaptiveRateLimiter(rate=100, burst=10, min_rate=1, max_rate=100)
+    limiter.acquire(URL)
+    limiter.record(URL, 0.1, throttled=True, retry_after=0.3)
+    assert limiter.rates()["www.leboncoin.fr"] == 50
+
+    start = time.monotonic()
+    limiter.acquire("https://autre.example/")
+    assert time.monotonic() - start < 0.1
+    assert limiter.acquire(URL) >= 0.25
+    assert time.monotonic() - start < 1.0
+
+
+def test_throttled_responses_during_pause_do_not_reduce_rate_again():
+    limiter = AdaptiveRateLimiter(rate=100, min_rate=1, max_rate=100)
+    limiter.record(URL, 0.1, throttled=True, retry_after=0.2)
+    limiter.record(URL, 0.1, throttled=True, retry_after=0.2)
+    assert limiter.rates()["www.leboncoin.fr"] == 50
+
+
+def test_retry_after_is_capped():
+    limiter = AdaptiveRateLimiter(rate=100, min_rate=1, max_rate=100, max_retry_after=0.2)
+    limiter.record(URL, 0.1, throttled=True, retry_after=3600)
+    assert limiter.acquire(URL) < 0.5
+
+
+def test_scraper_waits_for_retry_after_then_retries():
+    """Le 429 du serveur est transmis au limiteur, puis la requête est refaite après la pause"""
+    limiter = AdaptiveRateLimiter(rate=100, burst=10, min_rate=1, max_rate=100)
+    with StubServer(pages=3, capacity=1, burst=1, retry_after=0.5) as stub, Scraper(stub.url, rate_limiter=limiter) as scraper:
+        start = time.monotonic()
+        assert scraper.fetch(f"{stub.url}/recherche?page=1") is not None
+        assert scraper.fetch(f"{stub.url}/recherche?page=2") is not None
+        elapsed = time.monotonic() - start
+    assert stub.stats["throttled"] >= 1
+    assert elapsed >= 0.5
+    assert next(iter(limiter.rates().values())) < 100
+
+
+def test_scraper_without_limiter_retries_after_retry_after():
+    """Sans limiteur, urllib3 refait la requête après le délai demandé par le serveur"""
+    with StubServer(pages=3, capacity=1, burst=1, retry_after=1) as stub, Scraper(stub.url) as scraper:
+        start = time.monotonic()
+        assert scraper.fetch(f"{stub.url}/recherche?page=1") is not None
+        assert scraper.fetch(f"{stub.url}/recherche?page=2") is not None
+        elapsed = time.monotonic() - start
+    assert stub.stats["throttled"] >= 1
+    assert elapsed >= 0.9
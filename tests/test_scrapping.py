@@ -0,0 +1,83 @@
+import io
+import pytest
+import requests
+from benchmarks.fixtures import search_page_html
+from src.http_cache import ResponseCache
+from src.scrapping import ResponseTooLarge, Scraper
+
+
+def test_fetch_returns_page(stub):
+    with Scraper(stub.url) as scraper:
+        assert scraper.fetch(f"{stub.url}/recherche?page=1") == search_page_html(1, 3).encode()
+    assert stub.stats["requests"] == 1
+
+
+def test_fetch_missing_page_returns_none(stub):
+    with Scraper(stub.url) as scraper:
+        assert scraper.fetch(f"{stub.url}/inconnue") is None
+
+
+def test_fetch_revalidates_stale_cache_entry(stub, tmp_path):
+    """Une réponse périmée est revalidée avec If-None-Match ; le 304 sert le corps en cache"""
+    cache = ResponseCache(str(tmp_path / "http_cache.db"), ttl=0)
+    url = f"{stub.url}/recherche?page=1"
+    with Scraper(stub.url, cache=cache) as scraper:
+        first = scraper.fetch(url)
+        second = scraper.fetch(url)
+    cache.close()
+    assert second == first == search_page_html(1, 3).encode()
+    assert stub.stats["requests"] == 2
+    assert stub.stats["not_modified"] == 1
+    assert cache.revalidated == 1
+
+
+def test_fetch_serves_fresh_cache_entry_without_request(stub, tmp_path):
+    cache = ResponseCache(str(tmp_path / "http_cache.db"), ttl=3600)
+    url = f"{stub.url}/recherche?page=1"
+    with Scraper(stub.url, cache=cache) as scraper:
+        scraper.fetch(url)
+        assert scraper.fetch(url) == search_page_html(1, 3).encode()
+    cache.close()
+    assert stub.stats["requests"] == 1
+    assert cache.hits == 1
+
+
+class _CountingBody(io.BytesIO):
+    """Corps de réponse qui retient le nombre d'octets lus avant sa fermeture"""
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_fetch_rejects_response_larger_than_limit(stub, tmp_path):
+    """Une réponse plus grande que la limite (Content-Length) est abandonnée et n'entre pas en cache"""
+    cache = ResponseCache(str(tmp_path / "http_cache.db"))
+    url = f"{stub.url}/recherche?page=1"
+    with Scraper(stub.url, cache=cache, max_response_size=10_000) as scraper:
+        with pytest.raises(ResponseTooLarge):
+            scraper._get(url, None, None)
+        assert scraper.fetch(url) is None
+        assert cache.get(url) is None
+
+
+def test_read_body_stops_streamed_response_at_limit():
+    """Sans Content-Length, la lecture s'arrête dès que la limite est dépassée"""
+    response = requests.Response()
+    response.url = "https://www.leboncoin.fr/recherche"
+    response.raw = _CountingBody(b"x" * 1024 * 1024)
+    with Scraper(max_response_size=100_000) as scraper:
+        with pytest.raises(ResponseTooLarge):
+            scraper._read_body(response)
+    assert response.raw.closed
+    assert response.raw.bytes_read < 200_000
+
+
+def test_read_body_under_limit():
+    response = requests.Response()
+    response.raw = io.BytesIO(b"x" * 1000)
+    with Scraper(max_response_size=1000) as scraper:
+        assert scraper._read_body(response) == b"x" * 1000